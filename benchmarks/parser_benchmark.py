@@ -0,0 +1,88 @@
+"""Benchmark the HTML parser backends and check their output against html.parser
+
+Run from the repository root:
+
+    python -m benchmarks.parser_benchmark --check
+    python -m benchmarks.parser_benchmark --corpus data/corpus
+    python -m benchmarks.parser_benchmark --from-cache --check
+
+The corpus is a directory of saved card pages (*.html), or the page bodies
+already stored in the on-disk HTTP cache. Without either, --check runs on
+the small fixture pages in benchmarks/pages.
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from page_parser import BACKENDS, CREDIT_CARD_INDICATORS, extract_snippet
+from storage import data_path
+
+REFERENCE_BACKEND = 'html.parser'
+FIXTURE_PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+def load_corpus_dir(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append((path, f.read()))
+    return pages
+
+def load_corpus_from_cache():
+    db = sqlite3.connect(data_path("http_cache.sqlite3"))
+    try:
+        rows = db.execute("SELECT url, body FROM pages WHERE body IS NOT NULL").fetchall()
+    finally:
+        db.close()
+    return [(url, zlib.decompress(body).decode('utf-8')) for url, body in rows]
+
+def benchmark(pages, backend, repeat):
+    """Mean milliseconds per page"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, html in pages:
+            extract_snippet(html, name, CREDIT_CARD_INDICATORS, backend=backend)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(pages))
+
+def mismatches(pages, backend):
+    """Pages whose extracted snippet differs from the reference backend"""
+    return [
+        name for name, html in pages
+        if extract_snippet(html, name, CREDIT_CARD_INDICATORS, backend=backend)
+        != extract_snippet(html, name, CREDIT_CARD_INDICATORS, backend=REFERENCE_BACKEND)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help='directory of saved *.html pages (default: data/corpus, or the fixture pages with --check)')
+    parser.add_argument('--from-cache', action='store_true', help='use page bodies from the HTTP cache')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the corpus per backend')
+    parser.add_argument('--check', action='store_true', help='exit non-zero if any backend disagrees with html.parser')
+    args = parser.parse_args()
+
+    if args.from_cache:
+        pages = load_corpus_from_cache()
+    else:
+        pages = load_corpus_dir(args.corpus or (FIXTURE_PAGES if args.check else data_path('corpus', '')))
+    if not pages:
+        sys.exit("No pages found; save some card pages or run a search to fill the cache first.")
+
+    print(f"{len(pages)} pages, {sum(len(html) for _, html in pages) / 1024:.0f} KiB")
+    print(f"{'backend':<16}{'ms/page':>10}{'speedup':>10}{'mismatches':>12}")
+    reference_ms = benchmark(pages, REFERENCE_BACKEND, args.repeat)
+    failed = False
+    for backend in BACKENDS:
+        ms = reference_ms if backend == REFERENCE_BACKEND else benchmark(pages, backend, args.repeat)
+        different = [] if backend == REFERENCE_BACKEND else mismatches(pages, backend)
+        failed = failed or bool(different)
+        print(f"{backend:<16}{ms:>10.2f}{reference_ms / ms:>9.1f}x{len(different):>12}")
+        for name in different[:5]:
+            print(f"    differs: {name}")
+
+    if args.check and failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
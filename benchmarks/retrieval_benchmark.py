@@ -0,0 +1,68 @@
+"""Compare recall and latency of BM25, semantic and fused corpus retrieval
+
+Run from the repository root with a JSONL query log; lines may carry the
+URLs judged relevant, which enables recall@k:
+
+    {"query": "best card for airport lounges under 1000 fee", "relevant": ["https://..."]}
+
+    python -m benchmarks.retrieval_benchmark queries.jsonl --k 3
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from corpus_store import corpus_store
+from vector_index import vector_index
+from web_search import fuse_rankings
+
+def bm25(query, k):
+    return corpus_store.search(query, limit=k)
+
+def semantic(query, k):
+    return vector_index.search(query, k)
+
+def hybrid(query, k):
+    return fuse_rankings(bm25(query, k), semantic(query, k))[:k]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('queries', help='JSONL file of {"query": ..., "relevant": [...]} lines')
+    parser.add_argument('--k', type=int, default=3, help='results per query')
+    args = parser.parse_args()
+
+    with open(args.queries, encoding='utf-8') as f:
+        log = [json.loads(line) for line in f if line.strip()]
+    if not log:
+        sys.exit("Query log is empty")
+
+    methods = {'bm25': bm25}
+    if vector_index.available():
+        methods['semantic'] = semantic
+        methods['hybrid'] = hybrid
+        semantic(log[0]['query'], args.k)  # Load the model outside the timings
+    else:
+        print("sentence-transformers is not installed; benchmarking BM25 only")
+
+    print(f"{len(log)} queries, k={args.k}")
+    print(f"{'method':<10}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, method in methods.items():
+        latencies = []
+        recalls = []
+        for entry in log:
+            start = time.perf_counter()
+            urls = [page['url'] for page in method(entry['query'], args.k)]
+            latencies.append((time.perf_counter() - start) * 1000)
+            relevant = set(entry.get('relevant') or [])
+            if relevant:
+                recalls.append(len(relevant & set(urls)) / len(relevant))
+        recall = f"{statistics.mean(recalls):.3f}" if recalls else "n/a"
+        print(f"{name:<10}{recall:>10}{percentile(latencies, 0.5):>10.2f}"
+              f"{percentile(latencies, 0.95):>10.2f}{max(latencies):>10.2f}")
+
+if __name__ == '__main__':
+    main()
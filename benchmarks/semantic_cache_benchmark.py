@@ -0,0 +1,69 @@
+"""Measure the semantic answer cache's hit rate and false-hit rate at several thresholds
+
+Run from the repository root with a JSONL query log in arrival order. Each
+line names the question it asks; lines with the same intent are
+paraphrases that may share an answer:
+
+    {"query": "Regalia review", "intent": "hdfc-regalia-review"}
+    {"query": "tell me about HDFC Regalia card", "intent": "hdfc-regalia-review"}
+
+    python -m benchmarks.semantic_cache_benchmark queries.jsonl --thresholds 0.85 0.9 0.95
+
+Queries are replayed through a fresh cache per threshold: a miss stores the
+query's intent as its answer, and a hit is false if it returns another intent.
+"""
+import argparse
+import json
+import sys
+import time
+from response_cache import SemanticResponseCache, normalize_prompt, prompt_guard
+from vector_index import vector_index
+
+def replay(log, vectors, threshold, guard):
+    """(hits, false hits) replaying the log through a fresh cache"""
+    cache = SemanticResponseCache(lambda texts: [vectors[text] for text in texts],
+                                  threshold=threshold, guard=guard)
+    hits = false_hits = 0
+    for entry in log:
+        found = cache.get(entry['query'])
+        if found is None:
+            cache.store(entry['query'], entry['intent'], "")
+        else:
+            hits += 1
+            false_hits += found[0] != entry['intent']
+    return hits, false_hits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('queries', help='JSONL file of {"query": ..., "intent": ...} lines')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.8, 0.85, 0.9, 0.95])
+    parser.add_argument('--no-guard', action='store_true', help='match on similarity alone')
+    args = parser.parse_args()
+
+    if not vector_index.available():
+        sys.exit("sentence-transformers is not installed")
+    with open(args.queries, encoding='utf-8') as f:
+        log = [json.loads(line) for line in f if line.strip()]
+    if not log:
+        sys.exit("Query log is empty")
+
+    # Embed once; every threshold replays the same vectors, keyed by the
+    # normalized text the cache embeds
+    start = time.perf_counter()
+    texts = [normalize_prompt(entry['query']) for entry in log]
+    vectors = dict(zip(texts, vector_index.encode(texts)))
+    encode_ms = (time.perf_counter() - start) * 1000 / len(log)
+    guard = (lambda prompt: None) if args.no_guard else prompt_guard
+
+    repeats = len(log) - len({entry['intent'] for entry in log})
+    print(f"{len(log)} queries, {repeats} repeat intents (best possible hit rate "
+          f"{repeats / len(log):.1%}), {encode_ms:.1f} ms per embedding")
+    print(f"{'threshold':>10}{'hit rate':>10}{'false hits':>12}{'recall':>10}")
+    for threshold in args.thresholds:
+        hits, false_hits = replay(log, vectors, threshold, guard)
+        recall = (hits - false_hits) / repeats if repeats else 0.0
+        print(f"{threshold:>10.2f}{hits / len(log):>10.1%}"
+              f"{(false_hits / hits if hits else 0.0):>12.1%}{recall:>10.1%}")
+
+if __name__ == '__main__':
+    main()
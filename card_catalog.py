@@ -0,0 +1,418 @@
+"""Structured card catalog extracted from the crawled corpus
+
+Card facts (fees, reward rates per category, lounge visits, income
+requirement) are pulled out of crawled card pages into compact records,
+indexed by bank, fee band and reward category. Rebuild it with:
+
+    python card_catalog.py
+"""
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+import numpy as np
+from corpus_store import corpus_store, BANK_ALIASES, STOPWORDS
+from http_cache import http_cache
+from page_parser import extract_passages
+from storage import data_path, load_json, save_json
+
+# Reward categories, in the column order used by the catalog's rate matrix
+REWARD_CATEGORIES = ("general", "dining", "travel", "shopping", "fuel", "groceries", "utilities")
+
+# Words that tie a reward rate to a category
+CATEGORY_KEYWORDS = {
+    "general": ("all other", "other spends", "every spend", "all spends", "all retail", "general", "everything"),
+    "dining": ("dining", "restaurant", "swiggy", "zomato", "food delivery"),
+    "travel": ("travel", "flight", "hotel", "airline", "makemytrip", "cleartrip"),
+    "shopping": ("shopping", "online", "amazon", "flipkart", "myntra", "e-commerce"),
+    "fuel": ("fuel", "petrol", "diesel"),
+    "groceries": ("grocer", "supermarket", "bigbasket", "blinkit"),
+    "utilities": ("utility", "utilities", "bill payment", "electricity", "recharge"),
+}
+
+# Upper bounds (₹ annual fee) of each fee band
+FEE_BANDS = (
+    ("lifetime free", 0),
+    ("entry", 1000),
+    ("mid", 5000),
+    ("premium", 15000),
+    ("super premium", math.inf),
+)
+
+def fee_band(annual_fee):
+    """Name of the fee band an annual fee falls into, or None if unknown"""
+    if annual_fee is None:
+        return None
+    for band, upper in FEE_BANDS:
+        if annual_fee <= upper:
+            return band
+
+def card_id_for(name):
+    """Canonical id for a card name, e.g. 'HDFC Regalia Gold Credit Card' -> 'hdfc-regalia-gold'"""
+    # Page titles often carry a tagline after the card name
+    name = re.split(r'[:(]', name)[0]
+    words = re.findall(r'[a-z0-9]+', name.lower())
+    for i in range(len(words) - 1):
+        if words[i] == "credit" and words[i + 1] in ("card", "cards"):
+            words = words[:i]
+            break
+    while words and words[-1] in ("card", "credit", "cards"):
+        words.pop()
+    # 'Axis Bank Magnus' and 'Axis Magnus' are the same card
+    if len(words) > 2 and words[0] in BANK_ALIASES and words[1] in ("bank", "card"):
+        del words[1]
+    return "-".join(words)
+
+# Title words of listing, category and guide pages ("Best Travel Credit Card
+# in India 2025") that never name a card by themselves
+LISTING_WORDS = {
+    "top", "latest", "new", "popular", "all", "list", "apply", "online", "offer", "offers",
+    "travel", "shopping", "fuel", "dining", "grocery", "cashback", "lounge", "airport",
+    "lifetime", "free", "zero", "no", "low", "annual", "fee", "premium", "super", "entry",
+    "level", "student", "students", "business", "beginners", "in", "of", "to", "a", "on",
+}
+_BANK_WORDS = {word for bank in BANK_ALIASES for word in bank.split()} | {"bank", "card"}
+
+def single_card_id(title):
+    """Card id for the title of a page about one card, or None for listing, category and comparison pages"""
+    if not title or "card" not in title.lower():
+        return None
+    name = re.split(r'[:(]', title)[0]
+    if re.search(r'\b(?:cards|vs|versus)\b', name, re.I):
+        return None
+    card_id = card_id_for(title)
+    words = card_id.split("-") if card_id else []
+    if all(word in STOPWORDS or word in LISTING_WORDS or word.isdigit() for word in words):
+        return None  # "Best Credit Card in India 2025", "Travel Credit Card"
+    if all(word in _BANK_WORDS for word in words):
+        return None  # "HDFC Bank Credit Card Offers"
+    return card_id
+
+class CardRecord:
+    """Facts about one card; None marks a fact the pages did not state"""
+
+    __slots__ = (
+        "card_id", "name", "bank", "annual_fee", "joining_fee",
+        "reward_rates", "reward_caps", "monthly_reward_cap",
+        "fee_waiver_spend", "milestone_spend", "milestone_bonus",
+        "lounge_visits", "min_income", "source_url",
+    )
+
+    def __init__(self, card_id, name, bank=None, annual_fee=None, joining_fee=None,
+                 reward_rates=None, reward_caps=None, monthly_reward_cap=None,
+                 fee_waiver_spend=None, milestone_spend=None, milestone_bonus=None,
+                 lounge_visits=None, min_income=None, source_url=None):
+        self.card_id = card_id
+        self.name = name
+        self.bank = bank
+        self.annual_fee = annual_fee
+        self.joining_fee = joining_fee
+        # Percent value back per REWARD_CATEGORIES entry
+        self.reward_rates = tuple(reward_rates) if reward_rates else (None,) * len(REWARD_CATEGORIES)
+        # Monthly ₹ cap on rewards per REWARD_CATEGORIES entry, and on all rewards
+        self.reward_caps = tuple(reward_caps) if reward_caps else (None,) * len(REWARD_CATEGORIES)
+        self.monthly_reward_cap = monthly_reward_cap
+        # Annual spend that waives the annual fee; annual milestone spend and ₹ bonus
+        self.fee_waiver_spend = fee_waiver_spend
+        self.milestone_spend = milestone_spend
+        self.milestone_bonus = milestone_bonus
+        self.lounge_visits = lounge_visits
+        self.min_income = min_income
+        self.source_url = source_url
+
+    def rate(self, category):
+        return self.reward_rates[REWARD_CATEGORIES.index(category)]
+
+    def merge(self, other):
+        """Fill facts this record lacks from another record of the same card"""
+        for slot in ("bank", "annual_fee", "joining_fee", "monthly_reward_cap", "fee_waiver_spend",
+                     "milestone_spend", "milestone_bonus", "lounge_visits", "min_income", "source_url"):
+            if getattr(self, slot) is None:
+                setattr(self, slot, getattr(other, slot))
+        for slot in ("reward_rates", "reward_caps"):
+            setattr(self, slot, tuple(
+                mine if mine is not None else theirs
+                for mine, theirs in zip(getattr(self, slot), getattr(other, slot))
+            ))
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{slot: data.get(slot) for slot in cls.__slots__})
+
+# Scalar CardRecord slots exposed as columns
+NUMERIC_SLOTS = (
+    "annual_fee", "joining_fee", "monthly_reward_cap", "fee_waiver_spend",
+    "milestone_spend", "milestone_bonus", "lounge_visits", "min_income",
+)
+
+class CardCatalog:
+    """Card records with lookups by id, bank, fee band and reward category"""
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self.records = []
+        self._by_id = {}
+        self._indexes = None
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """Insert a record, merging it into an existing one with the same card_id"""
+        with self._lock:
+            existing = self._by_id.get(record.card_id)
+            if existing is not None:
+                existing.merge(record)
+            else:
+                self._by_id[record.card_id] = record
+                self.records.append(record)
+            self._indexes = None
+
+    def _build_indexes(self):
+        by_bank = defaultdict(list)
+        by_band = defaultdict(list)
+        by_category = {}
+        for record in self.records:
+            if record.bank:
+                by_bank[record.bank].append(record)
+            band = fee_band(record.annual_fee)
+            if band:
+                by_band[band].append(record)
+        for i, category in enumerate(REWARD_CATEGORIES):
+            rated = [record for record in self.records if record.reward_rates[i] is not None]
+            by_category[category] = sorted(rated, key=lambda record: record.reward_rates[i], reverse=True)
+        return by_bank, by_band, by_category
+
+    def _get_indexes(self):
+        with self._lock:
+            if self._indexes is None:
+                self._indexes = self._build_indexes()
+            return self._indexes
+
+    def get(self, card_id):
+        return self._by_id.get(card_id)
+
+    def by_bank(self, bank):
+        """Cards issued by a bank (a BANK_ALIASES key such as 'hdfc')"""
+        return list(self._get_indexes()[0].get(bank, []))
+
+    def in_fee_band(self, band):
+        """Cards whose annual fee falls in a FEE_BANDS band"""
+        return list(self._get_indexes()[1].get(band, []))
+
+    def best_for(self, category, limit=5):
+        """Cards with the highest known reward rate in a category"""
+        return self._get_indexes()[2].get(category, [])[:limit]
+
+    def columns(self):
+        """Columnar view for vectorised maths; unknown numbers are NaN
+
+        Returns (card_ids, {slot: float64 array}) with one array per
+        numeric slot; "reward_rates" and "reward_caps" are n_cards x
+        len(REWARD_CATEGORIES) matrices.
+        """
+        def column(slot):
+            return np.array([
+                np.nan if getattr(record, slot) is None else getattr(record, slot)
+                for record in self.records
+            ], dtype=np.float64)
+
+        def matrix(slot):
+            return np.array([
+                [np.nan if value is None else value for value in getattr(record, slot)]
+                for record in self.records
+            ], dtype=np.float64).reshape(len(self.records), len(REWARD_CATEGORIES))
+
+        columns = {slot: column(slot) for slot in NUMERIC_SLOTS}
+        columns["reward_rates"] = matrix("reward_rates")
+        columns["reward_caps"] = matrix("reward_caps")
+        return [record.card_id for record in self.records], columns
+
+    def __len__(self):
+        return len(self.records)
+
+    def save(self, path=None):
+        save_json(path or data_path("card_catalog.json"), [record.to_dict() for record in self.records])
+
+    @classmethod
+    def load(cls, path=None):
+        return cls(CardRecord.from_dict(data) for data in load_json(path or data_path("card_catalog.json"), []))
+
+# Fact patterns; amounts may be written ₹2,500 / Rs. 2500 / INR 2500
+AMOUNT = r'(?:₹|rs\.?|inr)\s*([\d,]+(?:\.\d+)?)\s*(lakhs?|lpa|l\b|k\b)?'
+ANNUAL_FEE_RE = re.compile(r'(?:annual|renewal)\s+fee[^₹\d\n]{0,40}?(?:' + AMOUNT + r'|(nil|free|zero))', re.I)
+JOINING_FEE_RE = re.compile(r'joining\s+fee[^₹\d\n]{0,40}?(?:' + AMOUNT + r'|(nil|free|zero))', re.I)
+INCOME_RE = re.compile(r'(?:income|salary)[^₹\d\n]{0,50}?' + AMOUNT, re.I)
+LOUNGE_RE = re.compile(r'(?<![\d.])(\d+)\s+(?:complimentary\s+)?(?:domestic\s+|international\s+)?(?:airport\s+)?lounge\s+(?:visits|access)', re.I)
+CAP_RE = re.compile(r'(?:capped at|cap of|maximum of|max\.?|up to|upto)\s*' + AMOUNT
+                    + r'\s*(?:per|a|/|in a)\s*(month|statement|billing cycle|quarter|year|annum)', re.I)
+FEE_WAIVER_RE = re.compile(r'\b(?:waive[dr]?|waiver|revers(?:al|ed))\b', re.I)
+# The waiver threshold is the spend amount, not the fee that waiver sentences also quote
+SPEND_AMOUNT_RE = re.compile(r'spend(?:s|ing)?\s*(?:of\s*|over\s*|above\s*)?' + AMOUNT, re.I)
+MILESTONE_RE = re.compile(r'spend(?:s|ing)?\s*(?:of\s*|over\s*|above\s*)?' + AMOUNT
+                          + r'[^.\n₹]{0,80}?(?:get|earn|receive|worth)[^₹\d\n]{0,30}?' + AMOUNT, re.I)
+RATE_RE = re.compile(r'(?<![\d.])(\d+(?:\.\d+)?)\s*%\s*(?:cashback|value\s*back|rewards?|back)?\s*(?:on|for|at)\s+([^.|;\n]{3,40})', re.I)
+
+def _amount(number, unit):
+    value = float(number.replace(',', ''))
+    unit = (unit or '').lower()
+    if unit.startswith('l'):
+        value *= 100000
+    elif unit == 'k':
+        value *= 1000
+    return value
+
+def _fee(pattern, text):
+    match = pattern.search(text)
+    if not match:
+        return None
+    if match.group(3):
+        return 0.0  # Nil / free
+    return _amount(match.group(1), match.group(2))
+
+def _periods_per_year(sentence):
+    sentence = sentence.lower()
+    if "quarter" in sentence:
+        return 4
+    if "month" in sentence or "statement" in sentence or "billing cycle" in sentence:
+        return 12
+    return 1
+
+def _sentence_around(text, match):
+    start = max(text.rfind(".", 0, match.start()), text.rfind("\n", 0, match.start())) + 1
+    end = min(position for position in (text.find(".", match.end()), text.find("\n", match.end()), len(text))
+              if position != -1)
+    return text[start:end]
+
+def _categories_in(text):
+    text = text.lower()
+    return [
+        i for i, category in enumerate(REWARD_CATEGORIES)
+        if any(keyword in text for keyword in CATEGORY_KEYWORDS[category])
+    ]
+
+def _fee_waiver_spend(text):
+    for match in FEE_WAIVER_RE.finditer(text):
+        spend = SPEND_AMOUNT_RE.search(_sentence_around(text, match))
+        if spend:
+            return _amount(spend.group(1), spend.group(2))
+    return None
+
+def _bank_for(domain, title):
+    for bank, bank_domain in BANK_ALIASES.items():
+        if bank_domain == domain:
+            return bank
+    lowered = title.lower()
+    return next((bank for bank in BANK_ALIASES if bank in lowered), None)
+
+def extract_card(url, domain, title, passages):
+    """A CardRecord for a single-card page, or None if the page states no card facts"""
+    card_id = single_card_id(title)
+    if card_id is None:
+        return None
+    text = "\n".join(passages)
+
+    rates = [None] * len(REWARD_CATEGORIES)
+    for match in RATE_RE.finditer(text):
+        target = match.group(2).lower()
+        for i, category in enumerate(REWARD_CATEGORIES):
+            if any(keyword in target for keyword in CATEGORY_KEYWORDS[category]):
+                rate = float(match.group(1))
+                rates[i] = rate if rates[i] is None else max(rates[i], rate)
+
+    # Caps on a named category apply to it, other caps to all rewards (monthly ₹)
+    caps = [None] * len(REWARD_CATEGORIES)
+    monthly_cap = None
+    for match in CAP_RE.finditer(text):
+        cap = _amount(match.group(1), match.group(2)) * _periods_per_year(match.group(3)) / 12
+        categories = _categories_in(_sentence_around(text, match))
+        for i in categories:
+            caps[i] = cap if caps[i] is None else min(caps[i], cap)
+        if not categories:
+            monthly_cap = cap if monthly_cap is None else min(monthly_cap, cap)
+
+    # Milestones are annualised assuming steady spend across the year
+    milestone = MILESTONE_RE.search(text)
+    milestone_spend = milestone_bonus = None
+    if milestone:
+        periods = _periods_per_year(_sentence_around(text, milestone))
+        milestone_spend = _amount(milestone.group(1), milestone.group(2)) * periods
+        milestone_bonus = _amount(milestone.group(3), milestone.group(4)) * periods
+
+    income = INCOME_RE.search(text)
+    lounges = [int(visits) for visits in LOUNGE_RE.findall(text)]
+    record = CardRecord(
+        card_id=card_id,
+        name=title,
+        bank=_bank_for(domain, title),
+        annual_fee=_fee(ANNUAL_FEE_RE, text),
+        joining_fee=_fee(JOINING_FEE_RE, text),
+        reward_rates=rates,
+        reward_caps=caps,
+        monthly_reward_cap=monthly_cap,
+        fee_waiver_spend=_fee_waiver_spend(text),
+        milestone_spend=milestone_spend,
+        milestone_bonus=milestone_bonus,
+        lounge_visits=max(lounges) if lounges else None,
+        min_income=_amount(income.group(1), income.group(2)) if income else None,
+        source_url=url,
+    )
+    facts = (record.annual_fee, record.joining_fee, record.lounge_visits, record.min_income) + record.reward_rates
+    return record if any(fact is not None for fact in facts) else None
+
+def cached_pages(skip=()):
+    """Pages fetched live by web search, from the HTTP cache, as (url, domain, title, content)"""
+    pages = []
+    for url in http_cache.urls():
+        html = http_cache.body(url) if url not in skip else None
+        if not html:
+            continue
+        title, passages = extract_passages(html)
+        if passages:
+            pages.append((url, urlparse(url).netloc.lower().replace('www.', ''), title, "\n".join(passages)))
+    return pages
+
+def build_catalog(include_http_cache=False):
+    """Extract a catalog from every page in the corpus, bank pages taking precedence
+
+    include_http_cache adds pages web search fetched live that the crawler
+    has not stored.
+    """
+    pages = corpus_store.all_pages()
+    if include_http_cache:
+        pages += cached_pages(skip={page[0] for page in pages})
+    # Bank sites are authoritative, so their records are added (and win) first
+    pages.sort(key=lambda page: page[1] not in BANK_ALIASES.values())
+    catalog = CardCatalog()
+    for url, domain, title, content in pages:
+        record = extract_card(url, domain, title, content.split("\n"))
+        if record:
+            catalog.add(record)
+    return catalog
+
+_catalog = None
+_catalog_mtime = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """The saved catalog, reloaded when a rebuild replaces the file"""
+    global _catalog, _catalog_mtime
+    path = data_path("card_catalog.json")
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+    with _catalog_lock:
+        if _catalog is None or mtime != _catalog_mtime:
+            _catalog = CardCatalog.load(path)
+            _catalog_mtime = mtime
+        return _catalog
+
+if __name__ == '__main__':
+    catalog = build_catalog()
+    catalog.save()
+    print(f"Catalog: {len(catalog)} cards")
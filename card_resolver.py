@@ -0,0 +1,146 @@
+"""Resolve card names in a query to canonical card ids and their known pages
+
+Every single-card page in the crawled corpus, and every catalog card, is
+indexed by its name words, with and without the bank name, in a word trie.
+A query is matched by walking the trie from each word, after snapping
+misspelt words to the known name word one edit away.
+"""
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import urlparse
+from card_catalog import single_card_id, get_catalog
+from corpus_store import corpus_store, banks_in, BANK_ALIASES, STOPWORDS
+
+# Name words too common to identify a card without its bank
+GENERIC_NAME_WORDS = {
+    "platinum", "gold", "silver", "titanium", "signature", "select", "classic",
+    "premium", "prime", "rewards", "reward", "cashback", "world", "elite", "infinite",
+    "privilege", "first", "bank", "card", "plus", "pro", "one", "lifetime", "free",
+}
+
+# Words between the bank and the card name ("Axis Bank Magnus", "SBI Card ELITE")
+BANK_FILLER_WORDS = {"bank", "card"}
+
+# Query words this long may be one edit away from a known name word
+MIN_FUZZY_LENGTH = 5
+
+def words_in(text):
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+def _deletes(word):
+    """word with each single character removed"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+_BANK_WORDS = {word for bank in BANK_ALIASES for word in bank.split()}
+
+class CardResolver:
+    """Word trie from card-name aliases to card ids, with the pages known for each card"""
+
+    def __init__(self, pages):
+        # card id -> {domain: url}, first page per domain wins
+        self.pages = defaultdict(dict)
+        for url, domain, title in pages:
+            # Listing and category pages ("Best Credit Cards in India") name no card
+            card_id = single_card_id(title)
+            if card_id:
+                self.pages[card_id].setdefault(domain, url)
+
+        self._trie = {}
+        self.banks = {}
+        for card_id in self.pages:
+            words = card_id.split("-")
+            banks = banks_in(" ".join(words))
+            self.banks[card_id] = banks[0] if banks else None
+            self._add(words, card_id)
+            # The name without the bank, as people usually type it
+            short = [word for word in words if word not in _BANK_WORDS and word not in BANK_FILLER_WORDS]
+            if short != words and (len(short) > 1 or (short and short[0] not in GENERIC_NAME_WORDS)):
+                self._add(short, card_id)
+        # Single-deletion index: two words within one edit (insert, delete,
+        # substitute or transpose) share an entry, so lookups stay O(len)
+        self.vocabulary = {word for card_id in self.pages for word in card_id.split("-")}
+        self._by_deletion = defaultdict(set)
+        for word in self.vocabulary:
+            if len(word) >= MIN_FUZZY_LENGTH - 1:
+                for variant in _deletes(word) | {word}:
+                    self._by_deletion[variant].add(word)
+        self._correct = lru_cache(maxsize=4096)(self._closest_word)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def _add(self, words, card_id):
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault("", set()).add(card_id)
+
+    def _closest_word(self, word):
+        if word in self.vocabulary or len(word) < MIN_FUZZY_LENGTH or word in STOPWORDS:
+            return word
+        candidates = set()
+        for variant in _deletes(word) | {word}:
+            candidates |= self._by_deletion.get(variant, set())
+        # Ambiguous corrections are worse than none
+        return candidates.pop() if len(candidates) == 1 else word
+
+    def resolve(self, query):
+        """Card ids named in the query, in the order they appear"""
+        words = [self._correct(word) for word in words_in(query)]
+        # Match card ids, which drop 'bank'/'card' after the bank name
+        words = [
+            word for i, word in enumerate(words)
+            if not (i and word in BANK_FILLER_WORDS and words[i - 1] in BANK_ALIASES)
+        ]
+        banks = banks_in(" ".join(words))
+        found = []
+        i = 0
+        while i < len(words):
+            # Longest alias starting at this word
+            node, matched, end = self._trie, None, i
+            for j in range(i, len(words)):
+                node = node.get(words[j])
+                if node is None:
+                    break
+                if "" in node:
+                    matched, end = node[""], j + 1
+            if not matched:
+                i += 1
+                continue
+            candidates = sorted(matched)
+            if len(candidates) > 1 and banks:
+                candidates = [card_id for card_id in candidates if self.banks[card_id] in banks]
+            # An alias shared by several cards is only used if the bank settles it
+            if len(candidates) == 1 and candidates[0] not in found:
+                found.append(candidates[0])
+            i = end
+        return found
+
+    def best_page(self, card_id, domains):
+        """(domain, url) of the card's page on the first of domains that has one, or None"""
+        known = self.pages.get(card_id, {})
+        for domain in domains:
+            if domain in known:
+                return domain, known[domain]
+        return None
+
+_resolver = None
+_resolver_catalog = None
+_resolver_lock = threading.Lock()
+
+def get_resolver():
+    """Resolver over the crawled corpus and catalog, rebuilt when the catalog is reloaded"""
+    global _resolver, _resolver_catalog
+    catalog = get_catalog()
+    with _resolver_lock:
+        if _resolver_catalog is not catalog:
+            pages = corpus_store.page_titles()
+            pages += [
+                (record.source_url, urlparse(record.source_url).netloc.lower().replace('www.', ''), record.name)
+                for record in catalog.records if record.source_url
+            ]
+            _resolver = CardResolver(pages)
+            _resolver_catalog = catalog
+        return _resolver
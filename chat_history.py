@@ -0,0 +1,140 @@
+"""Keep the history sent to Gemini bounded as a conversation grows
+
+The last few turns are sent verbatim; older turns are folded into one
+summary exchange that keeps each question with the cards and figures its
+answer mentioned. Token counts are estimated locally, so trimming costs no
+API calls.
+"""
+import math
+import os
+import re
+from reward_calculator import GROUNDING_MARKER
+from structured_response import parse_structured, to_markdown
+
+# Turns (question + answer) always sent verbatim
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+# Estimated tokens of history sent with each request
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "12000"))
+# Oldest summary lines are dropped beyond this
+SUMMARY_TOKEN_BUDGET = 1500
+
+SUMMARY_HEADER = "Summary of our earlier conversation:"
+SUMMARY_ACK = "Understood, I'll keep that context in mind."
+
+# Gemini tokenizes English at roughly four characters per token
+CHARS_PER_TOKEN = 4
+
+FIGURE_RE = re.compile(r'₹\s?[\d,]+(?:\.\d+)?(?:\s?(?:lakh|l|k)\b)?|\b\d+(?:\.\d+)?\s?%', re.I)
+MAX_SUMMARY_CARDS = 6
+MAX_SUMMARY_FIGURES = 8
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _text(message):
+    """Text of a history entry, whether a Content proto or a dict"""
+    if isinstance(message, dict):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in message["parts"])
+    return "".join(part.text for part in message.parts)
+
+def _role(message):
+    return message["role"] if isinstance(message, dict) else message.role
+
+def _unique(items, limit):
+    seen = []
+    for item in items:
+        item = item.strip(" *")
+        if item and item not in seen:
+            seen.append(item)
+    return seen[:limit]
+
+def table_labels(answer):
+    """Row labels and column headers of the answer's markdown and HTML tables (usually card names)"""
+    labels = []
+    header = True
+    comparison = False
+    for line in answer.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            header = True  # The next table starts with its header row
+            continue
+        cells = [cell.strip() for cell in line.strip("|").split("|")]
+        if all(set(cell) <= set("-: ") for cell in cells):
+            continue  # Separator row
+        if header:
+            # Comparison tables name the cards across the header, with
+            # features down the first column; other tables list cards down it
+            comparison = len(cells) > 2
+            if comparison:
+                labels.extend(cells[1:])
+        elif not comparison:
+            labels.append(cells[0])
+        header = False
+    for row in re.findall(r'<tr[^>]*>(.*?)</tr>', answer, re.S | re.I):
+        first = re.search(r'<td[^>]*>(.*?)</td>', row, re.S | re.I)
+        if first:
+            labels.append(re.sub(r'<[^>]+>', '', first.group(1)))
+    return [label for label in labels if not FIGURE_RE.fullmatch(label.strip())]
+
+def summarize_turn(question, answer):
+    """One summary line: the question, the cards its answer tabulated, and the key figures"""
+    question = re.sub(r'^For Indian credit cards only:\s*', '', question)
+    question = " ".join(question.split(GROUNDING_MARKER)[0].split())
+    if len(question) > 160:
+        question = question[:157] + "..."
+    line = f"- Q: {question}"
+    structured = parse_structured(answer)
+    if structured:
+        answer = to_markdown(structured[0]) + structured[1]
+    cards = _unique(table_labels(answer), MAX_SUMMARY_CARDS)
+    if cards:
+        line += f" | Covered: {', '.join(cards)}"
+    figures = _unique(FIGURE_RE.findall(answer), MAX_SUMMARY_FIGURES)
+    if figures:
+        line += f" | Figures: {', '.join(figures)}"
+    return line
+
+def turn_tokens(history, preamble=0):
+    """Estimated tokens of each exchange after the preamble, as (question, answer) pairs"""
+    messages = list(history)[preamble:]
+    return [
+        (estimate_tokens(_text(messages[i])), estimate_tokens(_text(messages[i + 1])))
+        for i in range(0, len(messages) - 1, 2)
+    ]
+
+def compact_history(history, preamble=0, keep_turns=HISTORY_KEEP_TURNS, token_budget=HISTORY_TOKEN_BUDGET):
+    """History to send next: preamble, a summary of older turns, and the most recent turns verbatim
+
+    Returns the history unchanged (the same object) if it already fits.
+    """
+    messages = list(history)
+    head, rest = messages[:preamble], messages[preamble:]
+    summary_lines = []
+    if len(rest) >= 2 and _role(rest[0]) == "user" and _text(rest[0]).startswith(SUMMARY_HEADER):
+        summary_lines = _text(rest[0])[len(SUMMARY_HEADER):].strip().splitlines()
+        rest = rest[2:]
+    turns = [rest[i:i + 2] for i in range(0, len(rest) - 1, 2)]
+    trailing = rest[len(turns) * 2:]  # An unanswered question, if any
+
+    def tokens():
+        fixed = sum(estimate_tokens(_text(message)) for message in head + trailing)
+        summary = estimate_tokens("\n".join(summary_lines)) if summary_lines else 0
+        return fixed + summary + sum(estimate_tokens(_text(m)) for turn in turns for m in turn)
+
+    folded = False
+    # Fold the oldest turns until few enough remain and they fit the budget;
+    # the latest turn is always kept
+    while len(turns) > 1 and (len(turns) > keep_turns or tokens() > token_budget):
+        question, answer = turns.pop(0)
+        summary_lines.append(summarize_turn(_text(question), _text(answer)))
+        folded = True
+    if not folded:
+        return history
+    while len(summary_lines) > 1 and estimate_tokens("\n".join(summary_lines)) > SUMMARY_TOKEN_BUDGET:
+        summary_lines.pop(0)
+
+    summary = [
+        {"role": "user", "parts": [SUMMARY_HEADER + "\n" + "\n".join(summary_lines)]},
+        {"role": "model", "parts": [SUMMARY_ACK]},
+    ]
+    return head + summary + [message for turn in turns for message in turn] + trailing
@@ -0,0 +1,174 @@
+"""Answer multi-card comparisons by fanning out one short extraction per card
+
+Each card named in the question is grounded in its crawled passages (or
+its known page, fetched live) and the catalog's figures, then a small
+JSON extraction call fills its column. All cards run concurrently, so a
+comparison takes as long as its slowest card; the standard comparison
+tables are assembled locally from the columns.
+"""
+import asyncio
+import json
+import threading
+import google.generativeai as genai
+from card_catalog import REWARD_CATEGORIES, get_catalog, single_card_id
+from card_resolver import get_resolver
+from corpus_store import corpus_store
+from http_client import get_session
+from page_parser import CREDIT_CARD_INDICATORS
+from web_search import PRIMARY_SOURCES, BANK_DOMAINS, fetch_known
+
+MAX_COMPARED_CARDS = 4
+EXTRACTION_MODEL = "gemini-2.0-flash-lite"
+EXTRACTION_MAX_TOKENS = 800
+# Per-card deadline in seconds; a card that misses it keeps its catalog figures
+EXTRACTION_DEADLINE = 25
+GROUNDING_PASSAGES = 12
+GROUNDING_MAX_CHARS = 6000
+
+# (table, row label, field) in the order the tables are assembled
+COMPARISON_ROWS = (
+    ("Basic Features", "Annual Fee", "annual_fee"),
+    ("Basic Features", "Joining Fee", "joining_fee"),
+    ("Basic Features", "Welcome Benefits", "welcome_benefits"),
+    ("Basic Features", "Income Required", "income_required"),
+    ("Reward Rates", "General Spend", "general_rate"),
+    ("Reward Rates", "Dining", "dining_rate"),
+    ("Reward Rates", "Travel", "travel_rate"),
+    ("Reward Rates", "Shopping", "shopping_rate"),
+    ("Reward Rates", "Fuel", "fuel_rate"),
+    ("Additional Benefits", "Lounge Access", "lounge_access"),
+    ("Additional Benefits", "Milestone Benefits", "milestone_benefits"),
+    ("Additional Benefits", "Other Benefits", "other_benefits"),
+)
+MISSING = "—"
+
+EXTRACTION_INSTRUCTION = (
+    "You extract credit card facts for the Indian market. Reply with one JSON object with exactly these keys: "
+    + ", ".join(field for _, _, field in COMPARISON_ROWS)
+    + ". Each value is a short string (under 12 words) using ₹ for amounts and % for rates, "
+    "taken from the provided page text and known figures. Use an empty string when the text does not say."
+)
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_extraction_model():
+    """The small JSON-mode model used for per-card extraction, built once"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = genai.GenerativeModel(
+                model_name=EXTRACTION_MODEL,
+                system_instruction=EXTRACTION_INSTRUCTION,
+                generation_config={
+                    "temperature": 0,
+                    "max_output_tokens": EXTRACTION_MAX_TOKENS,
+                    "response_mime_type": "application/json",
+                },
+            )
+        return _model
+
+def catalog_fields(record):
+    """Comparison fields the catalog already knows for a card"""
+    if record is None:
+        return {}
+    fields = {}
+    if record.annual_fee is not None:
+        fields["annual_fee"] = "Nil" if record.annual_fee == 0 else f"₹{record.annual_fee:,.0f}"
+    if record.joining_fee is not None:
+        fields["joining_fee"] = "Nil" if record.joining_fee == 0 else f"₹{record.joining_fee:,.0f}"
+    if record.min_income is not None:
+        fields["income_required"] = f"₹{record.min_income:,.0f}"
+    for category in ("general", "dining", "travel", "shopping", "fuel"):
+        rate = record.reward_rates[REWARD_CATEGORIES.index(category)]
+        if rate is not None:
+            fields[f"{category}_rate"] = f"{rate:g}%"
+    if record.lounge_visits is not None:
+        fields["lounge_access"] = f"{record.lounge_visits} visits/year"
+    return fields
+
+async def grounding_text(card_id, session):
+    """Page text for a card: its crawled passages, or a live snippet of its known page"""
+    resolver = get_resolver()
+    for domain, url in resolver.pages.get(card_id, {}).items():
+        passages = corpus_store.page_passages(url, GROUNDING_PASSAGES)
+        if passages:
+            return "\n".join(passages)[:GROUNDING_MAX_CHARS], url
+    page = resolver.best_page(card_id, PRIMARY_SOURCES + BANK_DOMAINS)
+    if page:
+        result = await fetch_known(session, page[1], CREDIT_CARD_INDICATORS)
+        if result and result.get('snippet'):
+            return result['snippet'], page[1]
+    return "", None
+
+async def extract_card_column(card_id, session):
+    """(card name, {field: value}, source url) for one card"""
+    record = get_catalog().get(card_id)
+    name = record.name if record else card_id.replace("-", " ").title()
+    known = catalog_fields(record)
+    fields = dict(known)
+    source = record.source_url if record else None
+    try:
+        text, url = await grounding_text(card_id, session)
+        source = url or source
+        prompt = (
+            f"Card: {name}\n"
+            f"Known figures: {json.dumps(known, ensure_ascii=False)}\n"
+            f"Page text:\n{text or '(none)'}"
+        )
+        response = await asyncio.wait_for(
+            get_extraction_model().generate_content_async(prompt), EXTRACTION_DEADLINE
+        )
+        extracted = json.loads(response.text)
+        for _, _, field in COMPARISON_ROWS:
+            value = extracted.get(field)
+            # Catalog figures come straight from the bank and aggregator pages
+            if isinstance(value, str) and value.strip() and field not in known:
+                fields[field] = value.strip()
+    except Exception:
+        pass  # The column keeps whatever the catalog knows
+    return name, fields, source
+
+def assemble_tables(columns):
+    """Markdown comparison tables with one column per card"""
+    names = [name for name, _, _ in columns]
+    sections = []
+    for table in dict.fromkeys(table for table, _, _ in COMPARISON_ROWS):
+        lines = [
+            f"### {table}",
+            "| Feature | " + " | ".join(names) + " |",
+            "|---------|" + "|".join("-" * max(3, len(name)) for name in names) + "|",
+        ]
+        for row_table, label, field in COMPARISON_ROWS:
+            if row_table == table:
+                values = [fields.get(field, MISSING).replace("|", "/") for _, fields, _ in columns]
+                lines.append(f"| {label} | " + " | ".join(values) + " |")
+        sections.append("\n".join(lines))
+    sources = [f"[{name}]({source})" for name, _, source in columns if source]
+    if sources:
+        sections.append("Sources: " + ", ".join(sources))
+    return "\n\n".join(sections)
+
+def plan_comparison(prompt):
+    """Card ids to compare if the question names between two and MAX_COMPARED_CARDS catalog cards, else None"""
+    card_ids = get_resolver().resolve(prompt)
+    if not 2 <= len(card_ids) <= MAX_COMPARED_CARDS:
+        return None
+    catalog = get_catalog()
+    # A card the catalog does not know would leave its column mostly empty,
+    # so such comparisons are generated instead
+    for card_id in card_ids:
+        record = catalog.get(card_id)
+        if record is None or single_card_id(record.name) != card_id:
+            return None
+    return card_ids
+
+async def compare_cards(card_ids):
+    """Comparison answer assembled from concurrent per-card extractions; must run on the shared loop"""
+    session = await get_session()
+    columns = await asyncio.gather(*(extract_card_column(card_id, session) for card_id in card_ids))
+    # Nothing found for any card means a generated answer will do better
+    if not any(fields for _, fields, _ in columns):
+        return None
+    names = ", ".join(name for name, _, _ in columns)
+    return f"Here is how the {names} compare, from each card's published terms:\n\n" + assemble_tables(columns)
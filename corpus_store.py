@@ -0,0 +1,201 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from storage import data_path
+
+# Words that say nothing about which card a query is about
+STOPWORDS = {
+    "the", "and", "for", "with", "about", "tell", "me", "what", "which", "is", "are",
+    "best", "compare", "comparison", "review", "vs", "versus", "card", "cards",
+    "credit", "features", "rewards", "benefits", "india", "indian",
+}
+
+# Bank names users type, mapped to the domain their pages come from
+BANK_ALIASES = {
+    "hdfc": "hdfcbank.com",
+    "sbi": "sbicard.com",
+    "icici": "icicibank.com",
+    "axis": "axisbank.com",
+    "idfc": "idfcfirstbank.com",
+    "indusind": "indusind.com",
+    "hsbc": "hsbc.co.in",
+    "standard chartered": "sc.com",
+    "kotak": "kotak.com",
+    "yes bank": "yesbank.in",
+    "rbl": "rblbank.com",
+}
+
+# BM25 column weights for (text, title)
+BM25_WEIGHTS = (1.0, 2.0)
+
+def query_terms(query):
+    """Lower-cased query words worth matching against the corpus"""
+    return [
+        term for term in re.findall(r'[a-z0-9]+', query.lower())
+        if len(term) > 2 and term not in STOPWORDS
+    ]
+
+def banks_in(query):
+    """Banks named in a query, as BANK_ALIASES keys"""
+    lowered = " " + " ".join(re.findall(r'[a-z0-9]+', query.lower())) + " "
+    return [bank for bank in BANK_ALIASES if f" {bank} " in lowered]
+
+def fts_query(terms):
+    """FTS5 MATCH expression for any of the terms, quoted so user text is never parsed as syntax"""
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+class CorpusStore:
+    """Card pages collected by the background crawler (crawler.py), with a BM25 passage index"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path("corpus.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                domain TEXT,
+                title TEXT,
+                content TEXT,
+                content_hash TEXT,
+                crawled_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_domain ON pages(domain)")
+
+        # One row per passage, indexed by an external-content FTS5 table
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY,
+                url TEXT,
+                domain TEXT,
+                title TEXT,
+                text TEXT
+            );
+            CREATE INDEX IF NOT EXISTS passages_url ON passages(url);
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+                text, title, content='passages', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS passages_ai AFTER INSERT ON passages BEGIN
+                INSERT INTO passages_fts(rowid, text, title) VALUES (new.id, new.text, new.title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS passages_ad AFTER DELETE ON passages BEGIN
+                INSERT INTO passages_fts(passages_fts, rowid, text, title) VALUES ('delete', old.id, old.text, old.title);
+            END;
+        """)
+        self._backfill_passages()
+        self._db.commit()
+
+    def _backfill_passages(self):
+        """Index pages stored before the passage index existed"""
+        rows = self._db.execute(
+            "SELECT url, domain, title, content FROM pages WHERE url NOT IN (SELECT DISTINCT url FROM passages)"
+        ).fetchall()
+        for url, domain, title, content in rows:
+            self._insert_passages(url, domain, title, content.split("\n"))
+
+    def _insert_passages(self, url, domain, title, passages):
+        self._db.executemany(
+            "INSERT INTO passages (url, domain, title, text) VALUES (?, ?, ?, ?)",
+            [(url, domain, title, passage) for passage in passages if passage]
+        )
+
+    def upsert_page(self, url, title, passages):
+        """Store a crawled page; returns False if its content is unchanged"""
+        content = "\n".join(passages)
+        content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        domain = urlparse(url).netloc.lower().replace('www.', '')
+        with self._lock:
+            row = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            if row and row[0] == content_hash:
+                self._db.execute("UPDATE pages SET crawled_at = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+                return False
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, domain, title, content, content_hash, time.time())
+            )
+            # Re-index only this page's passages
+            self._db.execute("DELETE FROM passages WHERE url = ?", (url,))
+            self._insert_passages(url, domain, title, passages)
+            self._db.commit()
+        return True
+
+    def search(self, query, limit=3, domains=None, banks=None, passages_per_page=2):
+        """Pages with the best BM25-ranked passages for the query
+
+        domains restricts results to those domains; banks to the domains of
+        the named banks (keys of BANK_ALIASES). Each page carries its
+        matching passages, best first.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        allowed = set(domains or []) | {BANK_ALIASES[bank] for bank in banks or [] if bank in BANK_ALIASES}
+        sql = (
+            "SELECT p.url, p.domain, p.title, p.text, bm25(passages_fts, ?, ?) AS rank "
+            "FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid "
+            "WHERE passages_fts MATCH ?"
+        )
+        params = list(BM25_WEIGHTS) + [fts_query(terms)]
+        if allowed:
+            sql += f" AND p.domain IN ({', '.join('?' for _ in allowed)})"
+            params += sorted(allowed)
+        # Over-fetch passages so enough distinct pages survive grouping
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit * passages_per_page * 5)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        pages = {}
+        for url, domain, title, text, rank in rows:
+            page = pages.setdefault(url, {"url": url, "domain": domain, "title": title, "passages": [], "rank": rank})
+            if len(page["passages"]) < passages_per_page:
+                page["passages"].append(text)
+        return list(pages.values())[:limit]
+
+    def all_pages(self):
+        """Every stored page as (url, domain, title, content)"""
+        with self._lock:
+            return self._db.execute("SELECT url, domain, title, content FROM pages").fetchall()
+
+    def page_titles(self):
+        """Every stored page as (url, domain, title)"""
+        with self._lock:
+            return self._db.execute("SELECT url, domain, title FROM pages").fetchall()
+
+    def page_passages(self, url, limit=20):
+        """The first passages of a stored page, in page order"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT text FROM passages WHERE url = ? ORDER BY id LIMIT ?", (url, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def all_passages(self):
+        """Every indexed passage as (id, text)"""
+        with self._lock:
+            return self._db.execute("SELECT id, text FROM passages ORDER BY id").fetchall()
+
+    def get_passages(self, ids):
+        """Passage id -> (url, domain, title, text) for the ids that still exist"""
+        ids = [int(passage_id) for passage_id in ids]
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, url, domain, title, text FROM passages WHERE id IN ({', '.join('?' for _ in ids)})",
+                ids
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+# Shared by every session in the process
+corpus_store = CorpusStore()
@@ -0,0 +1,150 @@
+"""Background crawler that fills the local card corpus
+
+Sweeps the card listing pages of PRIMARY_SOURCES and BANK_DOMAINS, follows
+links to individual card pages, and stores their extracted passages in
+data/corpus.sqlite3 so user queries can be answered from local data.
+
+    python crawler.py                     # one sweep
+    python crawler.py --interval 86400    # re-crawl daily
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urldefrag, urlparse
+from crawl4ai import (
+    AsyncWebCrawler,
+    BrowserConfig,
+    CrawlerRunConfig,
+    CacheMode,
+    RateLimiter,
+    CrawlerMonitor,
+    DisplayMode
+)
+from crawl4ai.async_dispatcher import MemoryAdaptiveDispatcher
+from corpus_store import corpus_store
+from page_parser import extract_passages
+from web_search import PRIMARY_SOURCES, BANK_DOMAINS, is_trusted_domain
+from vector_index import vector_index
+from card_catalog import build_catalog
+
+# Card listing pages the sweep starts from
+SEED_URLS = {
+    "cardinsider.com": "https://cardinsider.com/credit-cards/",
+    "bankbazaar.com": "https://www.bankbazaar.com/credit-card.html",
+    "hdfcbank.com": "https://www.hdfcbank.com/personal/pay/cards/credit-cards",
+    "sbicard.com": "https://www.sbicard.com/en/personal/credit-cards.page",
+    "icicibank.com": "https://www.icicibank.com/personal-banking/cards/credit-card",
+    "axisbank.com": "https://www.axisbank.com/retail/cards/credit-card",
+    "idfcfirstbank.com": "https://www.idfcfirstbank.com/credit-card",
+    "indusind.com": "https://www.indusind.com/in/en/personal/cards/credit-card.html",
+    "hsbc.co.in": "https://www.hsbc.co.in/credit-cards/",
+    "sc.com": "https://www.sc.com/in/credit-cards/",
+    "kotak.com": "https://www.kotak.com/en/personal-banking/cards/credit-cards.html",
+    "yesbank.in": "https://www.yesbank.in/personal-banking/yes-individual/cards/credit-cards",
+    "rblbank.com": "https://www.rblbank.com/personal-banking/cards/credit-cards",
+    "creditcardinsider.in": "https://creditcardinsider.in/",
+    "cardexpert.in": "https://www.cardexpert.in/",
+}
+
+# Links worth following from a listing page
+CARD_LINK_MARKERS = ("credit-card", "creditcard", "/cards/")
+
+MAX_PAGES_PER_DOMAIN = 60
+MEMORY_THRESHOLD_PERCENT = 70.0
+MAX_CONCURRENT_PAGES = 8
+
+def card_links(result, seen):
+    """Unvisited trusted links from a crawl result that look like card pages"""
+    links = []
+    for link in result.links.get("internal", []):
+        url = urldefrag(link.get("href", ""))[0]
+        if (url and url not in seen and is_trusted_domain(url)
+                and any(marker in urlparse(url).path.lower() for marker in CARD_LINK_MARKERS)):
+            links.append(url)
+    return links
+
+async def crawl_pages(crawler, urls, dispatcher):
+    run_config = CrawlerRunConfig(
+        cache_mode=CacheMode.BYPASS,
+        excluded_tags=['script', 'style', 'nav', 'footer', 'header', 'aside'],
+    )
+    return await crawler.arun_many(urls=urls, config=run_config, dispatcher=dispatcher)
+
+def store_result(result):
+    """Extract and store one crawled page; returns True if its content changed"""
+    if not result.success or not result.html:
+        return False
+    title, passages = extract_passages(result.html)
+    if not passages:
+        return False
+    return corpus_store.upsert_page(result.url, title, passages)
+
+async def sweep(domains, max_pages_per_domain=MAX_PAGES_PER_DOMAIN, monitor=False):
+    """Crawl seed pages, then the card pages they link to; returns (crawled, changed)"""
+    dispatcher = MemoryAdaptiveDispatcher(
+        memory_threshold_percent=MEMORY_THRESHOLD_PERCENT,
+        max_session_permit=MAX_CONCURRENT_PAGES,
+        rate_limiter=RateLimiter(
+            base_delay=(1.0, 3.0),  # Per-domain delay between requests, in seconds
+            max_delay=60.0,
+            max_retries=2,
+            rate_limit_codes=[429, 503]
+        ),
+        monitor=CrawlerMonitor(display_mode=DisplayMode.DETAILED) if monitor else None
+    )
+    browser_config = BrowserConfig(headless=True, verbose=False)
+
+    seeds = [SEED_URLS[domain] for domain in domains if domain in SEED_URLS]
+    seen = set(seeds)
+    crawled = changed = 0
+    async with AsyncWebCrawler(config=browser_config) as crawler:
+        seed_results = await crawl_pages(crawler, seeds, dispatcher)
+
+        # Second level: individual card pages, capped per domain
+        per_domain = {}
+        card_urls = []
+        for result in seed_results:
+            crawled += 1
+            changed += store_result(result)
+            for url in card_links(result, seen):
+                domain = urlparse(url).netloc.lower().replace('www.', '')
+                if per_domain.get(domain, 0) < max_pages_per_domain:
+                    per_domain[domain] = per_domain.get(domain, 0) + 1
+                    seen.add(url)
+                    card_urls.append(url)
+
+        if card_urls:
+            for result in await crawl_pages(crawler, card_urls, dispatcher):
+                crawled += 1
+                changed += store_result(result)
+    return crawled, changed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--domains', nargs='*', default=PRIMARY_SOURCES + BANK_DOMAINS,
+                        help='domains to sweep (default: all trusted domains)')
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES_PER_DOMAIN,
+                        help='card pages to follow per domain')
+    parser.add_argument('--interval', type=int, default=0,
+                        help='seconds between sweeps; 0 runs a single sweep')
+    parser.add_argument('--monitor', action='store_true', help='show the live crawler monitor')
+    args = parser.parse_args()
+
+    while True:
+        start = time.time()
+        crawled, changed = asyncio.run(sweep(args.domains, args.max_pages, args.monitor))
+        print(f"Crawled {crawled} pages, {changed} new or changed, "
+              f"{corpus_store.count()} in corpus ({time.time() - start:.0f}s)")
+        if changed and vector_index.available():
+            total, encoded = vector_index.build()
+            print(f"Semantic index: {total} passages ({encoded} newly encoded)")
+        if changed:
+            catalog = build_catalog()
+            catalog.save()
+            print(f"Catalog: {len(catalog)} cards")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
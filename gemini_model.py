@@ -0,0 +1,132 @@
+"""The Gemini model shared by every chat session
+
+The expert prompt is sent as a system instruction. One GenerativeModel
+carrying the instruction is built per process and reused. An instruction
+large enough for the API's cached content is instead stored once on the
+server, so sessions reference it rather than re-sending it with every turn;
+the current route instructions are well below that size.
+"""
+import datetime
+import logging
+import math
+import os
+import threading
+import time
+import google.generativeai as genai
+from google.api_core import exceptions
+from google.generativeai import caching
+
+MODEL_NAME = "gemini-2.0-flash"
+# Context caching needs a pinned model version
+CACHED_MODEL_NAME = "models/gemini-2.0-flash-001"
+
+GENERATION_CONFIG = {
+    "temperature": 0.3,  # Balanced for detailed yet factual responses
+    "top_p": 0.95,
+    "top_k": 60,
+    "max_output_tokens": 16384,  # Maximum token limit for comprehensive responses
+    "candidate_count": 1,
+}
+
+# Set CONTEXT_CACHING=false to always send the instruction with each request
+CONTEXT_CACHING = os.getenv("CONTEXT_CACHING", "true").lower() != "false"
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+# Cached content must hold at least this many tokens
+CONTEXT_CACHE_MIN_TOKENS = 4096
+# Gemini tokenizes English at roughly four characters per token
+CHARS_PER_TOKEN = 4
+# Extend the cache when less than this remains, so no request finds it expired
+CONTEXT_CACHE_REFRESH_SECONDS = 10 * 60
+# After a transient caching failure, requests use the plain instruction for this long
+CONTEXT_CACHE_RETRY_SECONDS = 60
+
+# Failures worth retrying; anything else (e.g. a prompt under the minimum
+# cacheable size, or a key without caching access) disables caching
+TRANSIENT_ERRORS = (
+    exceptions.TooManyRequests,
+    exceptions.InternalServerError,
+    exceptions.ServiceUnavailable,
+    exceptions.DeadlineExceeded,
+    exceptions.RetryError,
+    ConnectionError,
+    TimeoutError,
+)
+
+logger = logging.getLogger(__name__)
+
+class ModelProvider:
+    """Builds the model once and keeps its cached system instruction alive"""
+
+    def __init__(self, system_instruction, model_name=MODEL_NAME, cached_model_name=CACHED_MODEL_NAME,
+                 generation_config=None, caching_enabled=CONTEXT_CACHING):
+        self.system_instruction = system_instruction
+        self.model_name = model_name
+        self.cached_model_name = cached_model_name
+        self.generation_config = generation_config or GENERATION_CONFIG
+        self.caching_enabled = caching_enabled and cached_model_name is not None
+        tokens = math.ceil(len(system_instruction) / CHARS_PER_TOKEN)
+        if self.caching_enabled and tokens < CONTEXT_CACHE_MIN_TOKENS:
+            # A create call would only be rejected; the memoised model is used instead
+            logger.info("Instruction for %s is about %d tokens, below the %d-token minimum for "
+                        "context caching; sending it per request", model_name, tokens, CONTEXT_CACHE_MIN_TOKENS)
+            self.caching_enabled = False
+        self._lock = threading.Lock()
+        self._model = None
+        self._cache = None
+        self._cache_expires_at = 0
+        self._retry_at = 0
+        self._plain_model = None
+
+    def _cached_model(self):
+        now = time.time()
+        if self._cache is not None and self._cache_expires_at - now < CONTEXT_CACHE_REFRESH_SECONDS:
+            try:
+                self._cache.update(ttl=CONTEXT_CACHE_TTL)
+                self._cache_expires_at = now + CONTEXT_CACHE_TTL.total_seconds()
+            except Exception as e:
+                # Usually the cache expired while the process was idle; create it again
+                logger.info("Recreating the expired instruction cache: %s", e)
+                self._cache = None
+        if self._cache is None:
+            self._cache = caching.CachedContent.create(
+                model=self.cached_model_name,
+                display_name="credit-card-expert-prompt",
+                system_instruction=self.system_instruction,
+                ttl=CONTEXT_CACHE_TTL,
+            )
+            self._cache_expires_at = now + CONTEXT_CACHE_TTL.total_seconds()
+            self._model = genai.GenerativeModel.from_cached_content(
+                cached_content=self._cache,
+                generation_config=self.generation_config,
+            )
+        return self._model
+
+    def get(self):
+        """The shared GenerativeModel, its cached instruction refreshed if it is about to expire"""
+        with self._lock:
+            if self.caching_enabled and time.time() >= self._retry_at:
+                try:
+                    return self._cached_model()
+                except TRANSIENT_ERRORS as e:
+                    logger.warning("Context caching failed, retrying in %ds: %s", CONTEXT_CACHE_RETRY_SECONDS, e)
+                    self._retry_at = time.time() + CONTEXT_CACHE_RETRY_SECONDS
+                except Exception as e:
+                    logger.warning("Context caching unavailable, sending the instruction per request: %s", e)
+                    self.caching_enabled = False
+                self._cache = None
+            if self._plain_model is None:
+                self._plain_model = genai.GenerativeModel(
+                    model_name=self.model_name,
+                    generation_config=self.generation_config,
+                    system_instruction=self.system_instruction,
+                )
+            return self._plain_model
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "context_cached": self._cache is not None,
+                "cache_name": self._cache.name if self._cache is not None else None,
+                "cache_expires_in": max(0, int(self._cache_expires_at - time.time())) if self._cache else None,
+            }
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+from storage import data_path
+
+# Card pages change roughly weekly; after the TTL an entry is revalidated
+# with a conditional GET rather than downloaded again
+DEFAULT_TTL = 24 * 3600  # Seconds; bank sites and bankbazaar.com
+DOMAIN_TTLS = {
+    "cardinsider.com": 12 * 3600,
+}
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+# Hits update last_access in memory; it is written out in batches of this size
+# (and before any eviction) instead of committing on every lookup
+ACCESS_FLUSH_SIZE = 64
+
+def ttl_for(url):
+    """Freshness lifetime for a URL, by domain"""
+    domain = urlparse(url).netloc.lower().replace('www.', '')
+    return DOMAIN_TTLS.get(domain, DEFAULT_TTL)
+
+class HttpCache:
+    """Size-bounded LRU cache of page bodies and their extracted snippets"""
+
+    def __init__(self, path=None, max_bytes=MAX_CACHE_BYTES):
+        self.path = path or data_path("http_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                last_access REAL,
+                size INTEGER,
+                body BLOB,
+                snippet TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        self._stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._accessed = {}  # url -> last access time not yet written
+
+    def get(self, url):
+        """Cached entry for url as a dict, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, expires_at, snippet FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[url] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_access()
+                self._db.commit()
+        etag, last_modified, expires_at, snippet = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": expires_at > time.time(),
+            "snippet": json.loads(snippet) if snippet else None,
+        }
+
+    def body(self, url):
+        """Cached HTML for url, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT body FROM pages WHERE url = ?", (url,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row and row[0] else None
+
+    def urls(self):
+        """Every URL with a cached body"""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT url FROM pages WHERE body IS NOT NULL")]
+
+    def validators(self, entry):
+        """Conditional request headers for a stale entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, outcome):
+        """Count a lookup outcome: 'fresh_hits', 'revalidated' or 'misses'"""
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def refresh(self, url):
+        """Extend the lifetime of an entry after a 304 Not Modified"""
+        with self._lock:
+            self._db.execute("UPDATE pages SET expires_at = ? WHERE url = ?", (time.time() + ttl_for(url), url))
+            self._db.commit()
+
+    def store(self, url, body, snippet, etag=None, last_modified=None):
+        """Insert or replace an entry, evicting least recently used pages over the size bound"""
+        compressed = zlib.compress(body.encode("utf-8"))
+        snippet_json = json.dumps(snippet)
+        size = len(compressed) + len(snippet_json)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, now + ttl_for(url), now, size, compressed, snippet_json)
+            )
+            self._total_bytes += size
+            self._stats["stores"] += 1
+            self._accessed.pop(url, None)
+            self._flush_access()
+            self._evict()
+            self._db.commit()
+
+    def _flush_access(self):
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE pages SET last_access = ? WHERE url = ?",
+                [(accessed, url) for url, accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            row = self._db.execute("SELECT url, size FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (row[0],))
+            self._total_bytes -= row[1]
+            self._stats["evictions"] += 1
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["bytes"] = self._total_bytes
+        lookups = stats["fresh_hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_rate"] = (stats["fresh_hits"] + stats["revalidated"]) / lookups if lookups else 0.0
+        return stats
+
+# Shared by every session in the process
+http_cache = HttpCache()
@@ -0,0 +1,131 @@
+import asyncio
+import atexit
+import queue
+import threading
+import aiohttp
+
+# Streamlit re-executes main.py on every rerun and asyncio.run() tears its loop
+# down each time, so the loop and the pooled session live here, in an imported
+# module that stays loaded for the lifetime of the server process.
+
+REQUEST_TIMEOUT = 10  # Seconds, per request
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive'
+}
+
+# Connector limits
+TOTAL_CONNECTION_LIMIT = 100
+PER_HOST_CONNECTION_LIMIT = 8
+DNS_CACHE_TTL = 300  # Seconds
+KEEPALIVE_TIMEOUT = 60  # Seconds
+
+_lock = threading.Lock()
+_loop = None
+_session = None
+_session_lock = None
+
+# Connection-reuse counters, updated from aiohttp trace hooks
+_stats = {
+    "requests": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+    "dns_cache_hits": 0,
+    "dns_cache_misses": 0,
+}
+
+def get_loop():
+    """Return the process-wide event loop, starting its thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="http-client-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+def run_coroutine(coro):
+    """Schedule a coroutine on the shared loop and return a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def iterate_in_loop(async_iterable):
+    """Consume an async iterable on the shared loop from synchronous code"""
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((done, e))
+        else:
+            items.put((done, None))
+
+    future = run_coroutine(pump())
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Stop the producer if the consumer bails out early
+        future.cancel()
+
+def _count(key):
+    async def hook(session, trace_config_ctx, params):
+        _stats[key] += 1
+    return hook
+
+def _trace_config():
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_count("requests"))
+    trace_config.on_connection_create_end.append(_count("connections_created"))
+    trace_config.on_connection_reuseconn.append(_count("connections_reused"))
+    trace_config.on_dns_cache_hit.append(_count("dns_cache_hits"))
+    trace_config.on_dns_cache_miss.append(_count("dns_cache_misses"))
+    return trace_config
+
+async def get_session():
+    """Return the pooled aiohttp session; must be awaited on the shared loop"""
+    global _session, _session_lock
+    if _session_lock is None:
+        _session_lock = asyncio.Lock()
+    async with _session_lock:
+        if _session is None or _session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=TOTAL_CONNECTION_LIMIT,
+                limit_per_host=PER_HOST_CONNECTION_LIMIT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            _session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                headers=DEFAULT_HEADERS,
+                trace_configs=[_trace_config()],
+            )
+    return _session
+
+def connection_stats():
+    """Snapshot of the connection-reuse counters"""
+    stats = dict(_stats)
+    connections = stats["connections_created"] + stats["connections_reused"]
+    stats["reuse_ratio"] = stats["connections_reused"] / connections if connections else 0.0
+    return stats
+
+def _close():
+    if _loop is not None and _session is not None and not _session.closed:
+        try:
+            run_coroutine(_session.close()).result(timeout=5)
+        except Exception:
+            pass
+
+atexit.register(_close)
@@ -3,60 +3,27 @@ import streamlit as st
 from dotenv import load_dotenv
 import google.generativeai as genai
 import time
-import re
-from urllib.parse import urlparse
-import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
 import random
-from crawl4ai import (
-    AsyncWebCrawler, 
-    BrowserConfig, 
-    CrawlerRunConfig, 
-    CacheMode,
-    RateLimiter,
-    CrawlerMonitor,
-    DisplayMode
-)
-from crawl4ai.async_dispatcher import MemoryAdaptiveDispatcher
 import pandas as pd
-from response_formatter import format_and_render_response
+from response_formatter import format_and_render_response, StreamingResponseRenderer
+from web_search import enhance_with_web_search
+from http_client import run_coroutine, iterate_in_loop, connection_stats
+from url_templates import template_stats
+from http_cache import http_cache
+from url_health import url_health
+from corpus_store import corpus_store
+from reward_calculator import grounding_context
+from response_cache import create_response_cache, create_semantic_cache, normalize_prompt
+from single_flight import web_flights, answer_flights
+from chat_history import compact_history, turn_tokens
+from gemini_model import ModelProvider, GENERATION_CONFIG
+from query_router import ROUTES, REVIEW, FACT, COMPARISON, classify, answer_fact, route_stats
+from comparison_planner import plan_comparison, compare_cards
+from structured_response import STRUCTURED_RESPONSES, STRUCTURED_TEMPLATE, generation_config
 
 # Load environment variables
 load_dotenv()
 
-# Define official bank and trusted domains
-PRIMARY_SOURCES = [
-    "cardinsider.com",  # Primary source
-    "bankbazaar.com",   # Secondary source
-]
-
-BANK_DOMAINS = [
-    "hdfcbank.com",
-    "sbicard.com",
-    "icicibank.com",
-    "axisbank.com",
-    "idfcfirstbank.com",
-    "indusind.com",
-    "hsbc.co.in",
-    "sc.com",
-    "kotak.com",
-    "yesbank.in",
-    "rblbank.com",
-    "creditcardinsider.in",
-    "cardexpert.in",
-]
-
-def is_trusted_domain(url):
-    """Check if the URL belongs to a trusted domain"""
-    try:
-        domain = urlparse(url).netloc.lower()
-        # Remove 'www.' if present
-        domain = domain.replace('www.', '')
-        return domain in PRIMARY_SOURCES or domain in BANK_DOMAINS
-    except:
-        return False
-
 # Streamlit page configuration
 st.set_page_config(
     page_title="Indian Credit Card Recommender", 
@@ -174,6 +141,42 @@ if not google_api_key:
     
 genai.configure(api_key=google_api_key)
 
+# Stream responses into the page as they are generated (set to "false" to render only complete answers)
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() != "false"
+
+@st.cache_resource
+def get_model_providers():
+    """Model and cached system instruction per query class, shared by every session"""
+    providers = {}
+    for name, route in ROUTES.items():
+        instruction = CREDIT_CARD_EXPERT_PROMPT + route["template"]
+        config = {**GENERATION_CONFIG, "max_output_tokens": route["max_output_tokens"]}
+        if STRUCTURED_RESPONSES:
+            instruction += STRUCTURED_TEMPLATE
+            config = generation_config(config)
+        providers[name] = ModelProvider(
+            instruction,
+            model_name=route["model"],
+            cached_model_name=route["cached_model"],
+            generation_config=config,
+        )
+    return providers
+
+model_providers = get_model_providers()
+
+@st.cache_resource
+def get_response_cache():
+    """Answer cache shared by every session"""
+    return create_response_cache()
+
+@st.cache_resource
+def get_semantic_cache():
+    """Paraphrase-matching answer cache shared by every session (None without sentence-transformers)"""
+    return create_semantic_cache()
+
+response_cache = get_response_cache()
+semantic_cache = get_semantic_cache()
+
 # Function to translate role for Streamlit
 def translate_role_for_streamlit(user_role):
     if user_role == "model":
@@ -181,268 +184,13 @@ def translate_role_for_streamlit(user_role):
     else:
         return user_role
 
-# Function to perform web search using aiohttp
-async def perform_web_search(query, num_results=3):
-    try:
-        # Primary source paths (more specific to detailed)
-        primary_paths = [
-            "/credit-card/compare/",
-            "/credit-cards/details/",
-            "/credit-card-reviews/",
-            "/credit-cards/search",
-            "/credit-cards"
-        ]
-        
-        # Verification source paths
-        verification_paths = [
-            "/credit-cards/benefits",
-            "/credit-card/offers",
-            "/credit-card/rewards",
-            "/cards/compare"
-        ]
-        
-        # First try primary sources
-        primary_urls = [
-            f"https://{domain}{path}{query.replace(' ', '-').lower()}"
-            for domain in PRIMARY_SOURCES
-            for path in primary_paths
-        ]
-        
-        # Then verification sources
-        verification_urls = [
-            f"https://{domain}{path}"
-            for domain in BANK_DOMAINS[:5]  # Limit to top 5 banks for speed
-            for path in verification_paths
-        ]
-        
-        formatted_results = []
-        timeout = aiohttp.ClientTimeout(total=10)  # Reduced timeout to 10 seconds
-        
-        # Essential credit card indicators with weights
-        credit_card_indicators = {
-            "reward rate": 3,
-            "cashback": 3,
-            "annual fee": 3,
-            "welcome offer": 2,
-            "lounge access": 2,
-            "credit limit": 2,
-            "joining fee": 2,
-            "benefits": 1,
-            "eligibility": 1
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Cache-Control': 'no-cache'
-        }
-        
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            # First search primary sources
-            primary_tasks = [
-                asyncio.create_task(fetch_url(session, url, credit_card_indicators))
-                for url in primary_urls
-            ]
-            
-            primary_results = await asyncio.gather(*primary_tasks, return_exceptions=True)
-            
-            # Process primary results
-            for result in primary_results:
-                if isinstance(result, dict) and result.get('snippet'):
-                    formatted_results.append({**result, 'source_type': 'primary'})
-                    if len(formatted_results) >= num_results:
-                        return formatted_results
-            
-            # If needed, try verification sources
-            if len(formatted_results) < num_results:
-                verification_tasks = [
-                    asyncio.create_task(fetch_url(session, url, credit_card_indicators))
-                    for url in verification_urls
-                ]
-                
-                verification_results = await asyncio.gather(*verification_tasks, return_exceptions=True)
-                
-                for result in verification_results:
-                    if isinstance(result, dict) and result.get('snippet'):
-                        formatted_results.append({**result, 'source_type': 'verification'})
-                        if len(formatted_results) >= num_results:
-                            break
-        
-        return formatted_results
-                
-    except Exception:
-        return []
-
-async def fetch_url(session, url, credit_card_indicators):
-    try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Quick cleanup
-                for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                    tag.decompose()
-                
-                # Find credit card specific content
-                card_content = soup.find('div', class_=lambda x: x and any(term in x.lower() for term in ['card-details', 'product-info', 'card-comparison', 'card-benefits']))
-                
-                if not card_content:
-                    card_content = soup
-                
-                # Extract text from paragraphs and lists
-                texts = []
-                for elem in card_content.find_all(['p', 'li', 'h2', 'h3', 'td']):
-                    text = elem.get_text(strip=True)
-                    if text and len(text) > 30:  # Minimum length check
-                        # Calculate relevance score
-                        score = sum(
-                            weight
-                            for term, weight in credit_card_indicators.items()
-                            if term in text.lower()
-                        )
-                        if score > 0:
-                            texts.append((text, score))
-                
-                if texts:
-                    # Sort by relevance score and combine top snippets
-                    texts.sort(key=lambda x: x[1], reverse=True)
-                    best_snippets = [text for text, _ in texts[:2]]
-                    
-                    # Clean up title
-                    title = soup.title.string if soup.title else ""
-                    title = re.sub(r'\s+', ' ', title).strip()
-                    title = re.sub(r'^(.*?)\s*[|\-]\s*.*$', r'\1', title)
-                    
-                    return {
-                        "title": title,
-                        "link": str(response.url),
-                        "snippet": " | ".join(best_snippets)[:250],
-                        "relevance_score": sum(score for _, score in texts[:2])
-                    }
-    except Exception:
-        pass
-    return None
-
-# Function to enhance credit card response with web search
-async def enhance_with_web_search(query):
-    try:
-        search_query = f"{query} credit card features rewards"
-        search_results = await perform_web_search(search_query)
-        
-        if search_results:
-            # Sort results by relevance score
-            search_results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
-            
-            # Remove duplicates based on snippet content
-            seen_snippets = set()
-            unique_results = []
-            for result in search_results:
-                snippet = result.get('snippet', '').strip()
-                # Create a simplified version of the snippet for comparison
-                simple_snippet = ' '.join(snippet.lower().split())
-                if simple_snippet and simple_snippet not in seen_snippets:
-                    seen_snippets.add(simple_snippet)
-                    unique_results.append(result)
-            
-            meaningful_results = [
-                result for result in unique_results
-                if result.get('snippet') and len(result['snippet'].strip()) > 50
-                and not any(term in result['snippet'].lower() for term in ['cookie', 'privacy', 'terms of use'])
-                and not result['snippet'].startswith('FIRST EA')  # Filter out repetitive IDFC updates
-            ]
-            
-            if meaningful_results:
-                enhancement = "\n\nLatest Credit Card Updates\n\n"
-                
-                # Group results by source type
-                primary_results = [r for r in meaningful_results if r['source_type'] == 'primary'][:2]  # Increased to 2 primary results
-                verification_results = [r for r in meaningful_results if r['source_type'] == 'verification'][:2]  # Increased to 2 verification results
-                
-                # Add primary source information
-                for result in primary_results:
-                    domain = urlparse(result['link']).netloc.replace('www.', '')
-                    snippet = result['snippet'].strip()
-                    if not any(existing in snippet.lower() for existing in seen_snippets):
-                        enhancement += f"• From {domain}: {snippet}\n\n"
-                        seen_snippets.add(snippet.lower())
-                
-                # Add verification information
-                for result in verification_results:
-                    domain = urlparse(result['link']).netloc.replace('www.', '')
-                    snippet = result['snippet'].strip()
-                    if not any(existing in snippet.lower() for existing in seen_snippets):
-                        enhancement += f"• From {domain}: {snippet}\n\n"
-                        seen_snippets.add(snippet.lower())
-                
-                # Add disclaimer
-                enhancement += "\n*Please verify the latest terms and conditions on the official bank website.*"
-                
-                return enhancement
-        return ""
-                
-    except Exception:
-        return ""
-
-# Initialize session state for chat history and system prompt
+# Initialize session state for chat history
 if "chat_session" not in st.session_state:
-    # Initialize chat with system prompt
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash",
-        generation_config={
-            "temperature": 0.3,  # Balanced for detailed yet factual responses
-            "top_p": 0.95,
-            "top_k": 60,
-            "max_output_tokens": 16384,  # Maximum token limit for comprehensive responses
-            "candidate_count": 1,
-        }
-    )
+    # The expert instructions live in the shared model, not in each history
+    st.session_state.chat_session = model_providers[REVIEW].get().start_chat(history=[])
     
-    # Start chat with the system prompt
-    st.session_state.chat_session = model.start_chat(
-        history=[
-            {
-                "role": "user",
-                "parts": [CREDIT_CARD_EXPERT_PROMPT + """
-
-IMPORTANT: Always provide comprehensive responses following this exact structure for card reviews and comparisons:
-
-1. Start with a brief introduction
-2. Follow the section headers exactly:
-   - ## Key Features and Benefits
-   - ## Milestone Benefits
-   - ## Reward Structure (with table)
-   - ## Fees and Charges (with table)
-   - ## Eligibility Criteria
-   - ## Current Updates
-   - ## Comparison with Other Cards (with table)
-   - ## Who Should Apply
-   - ## When Not to Apply
-   - ## Conclusion
-   - ## Additional Tips
-
-3. Use tables for all numerical comparisons
-4. Include specific numbers and current data
-5. End with actionable recommendations"""]
-            },
-            {
-                "role": "model",
-                "parts": ["""Hello! 👋 I'm your Indian Credit Card Expert, and I'm here to help you make informed decisions about credit cards in India. I'll provide detailed, structured responses following a comprehensive format that covers all important aspects of credit cards.
-
-For every card review and comparison, I will include:
-- Complete feature analysis with current data
-- Detailed reward structures and benefits
-- Comprehensive fee breakdowns
-- Clear eligibility criteria
-- Up-to-date comparisons
-- Specific recommendations
-
-How may I assist you today?"""]
-            }
-        ]
-    )
+    # Every exchange as shown to the user; the chat session's own history is compacted
+    st.session_state.transcript = []
     
     # Rate limit tracking
     st.session_state.last_request_time = 0
@@ -461,13 +209,45 @@ All information is specific to the Indian market and includes the latest offers
 - Ask about features (e.g., "Which cards offer best airport lounge access?")
 """)
 
+# Process-wide diagnostics (shared by all sessions)
+with st.sidebar.expander("Diagnostics"):
+    st.caption("Outbound connection pool")
+    st.json(connection_stats())
+    st.caption("Web search URL templates")
+    st.json(template_stats.summary())
+    st.caption("Page cache")
+    st.json(http_cache.stats())
+    st.caption("Failing URLs and domains")
+    st.json(url_health.stats())
+    st.caption("Answer cache")
+    st.json(response_cache.stats())
+    if semantic_cache is not None:
+        st.caption("Paraphrase answer cache")
+        st.json(semantic_cache.stats())
+    st.caption("Latency by query class")
+    st.json(route_stats.summary())
+    st.caption("Models")
+    st.json({name: provider.stats() for name, provider in model_providers.items()})
+    st.caption("Shared in-flight requests")
+    st.json({"web": web_flights.stats(), "answers": answer_flights.stats()})
+    st.caption("Crawled corpus")
+    st.json({"pages": corpus_store.count()})
+
+# Prompt size of this conversation
+with st.sidebar.expander("Conversation tokens"):
+    history = st.session_state.chat_session.history
+    st.json({
+        "history_sent": sum(question + answer for question, answer in turn_tokens(history)),
+        "turns": [{"question": question, "answer": answer} for question, answer in turn_tokens(history)],
+    })
+
 # Display chat history
-for message in st.session_state.chat_session.history[2:]:  # Skip the system prompt
-    with st.chat_message(translate_role_for_streamlit(message.role)):
-        if message.role == "model":
-            format_and_render_response(message.parts[0].text)
+for role, text in st.session_state.transcript:
+    with st.chat_message(translate_role_for_streamlit(role)):
+        if role == "model":
+            format_and_render_response(text)
         else:
-            st.markdown(message.parts[0].text)
+            st.markdown(text)
 
 # Get user input
 user_prompt = st.chat_input("Ask about credit cards in India...")
@@ -491,20 +271,120 @@ if user_prompt:
         
         # Enhanced user prompt to focus on Indian credit cards
         enhanced_prompt = f"For Indian credit cards only: {user_prompt}"
+        # Spend-based questions get computed card values to ground the answer
+        enhanced_prompt += grounding_context(user_prompt)
+        
+        # The question's class picks the model, output budget and template
+        route = classify(user_prompt)
+        request_start = time.perf_counter()
+        
+        # Only first-turn questions are cached; later answers depend on the conversation
+        first_turn = not st.session_state.transcript
+        cached = response_cache.get(user_prompt) if first_turn else None
+        if first_turn and cached is None and semantic_cache is not None:
+            cached = semantic_cache.get(user_prompt)
+        
+        # Concurrent identical questions share one web search and, on the
+        # first turn, one generated answer
+        flight_key = normalize_prompt(user_prompt)
+        
+        def remember_answer(answer, web_info):
+            """Add the exchange to the transcript and cache a first-turn answer for every session"""
+            st.session_state.transcript += [("user", user_prompt), ("model", answer)]
+            cache_answer(answer, web_info)
+        
+        def cache_answer(answer, web_info):
+            if first_turn:
+                response_cache.store(user_prompt, answer, web_info)
+                if semantic_cache is not None:
+                    semantic_cache.store(user_prompt, answer, web_info)
         
         # Show a spinner while waiting for the response
         with st.spinner("Analyzing Indian credit card options..."):
-            async def process_request():
+            def serve_cached(answer, web_info, free=True):
+                # Record the exchange so follow-up questions keep their context
+                st.session_state.chat_session.history = st.session_state.chat_session.history + [
+                    {"role": "user", "parts": [enhanced_prompt]},
+                    {"role": "model", "parts": [answer]},
+                ]
+                st.session_state.transcript += [("user", user_prompt), ("model", answer)]
+                with st.chat_message("assistant"):
+                    format_and_render_response(answer + web_info)
+                if free:
+                    st.session_state.requests_in_minute -= 1  # Cached answers are free
+            
+            def process_request():
+                """Answer the question; returns True if it was answered from local data"""
+                # Fact lookups the card catalog knows need no generation
+                local_answer = answer_fact(user_prompt) if route == FACT else None
+                if local_answer:
+                    serve_cached(local_answer, "")
+                    return True
+                if cached:
+                    serve_cached(*cached)
+                    return
+                if not first_turn:
+                    generate_answer()
+                    return
+                answer_future, leader = answer_flights.begin(flight_key)
+                if not leader:
+                    # Another session is already answering this question
+                    try:
+                        serve_cached(*answer_future.result())
+                    except Exception as e:
+                        st.error(f"Error getting response: {str(e)}")
+                        st.session_state.requests_in_minute -= 1  # Don't count failed requests
+                    return
+                answer = None
+                try:
+                    answer = generate_answer()
+                finally:
+                    # Waiting sessions get the answer, or the failure
+                    if answer:
+                        answer_future.set_result(answer)
+                    else:
+                        answer_future.set_exception(RuntimeError("The answer could not be generated"))
+            
+            def generate_answer():
+                """Generate, render and cache an answer; returns (answer, web_info), or None on failure"""
+                # Comparisons of known cards are extracted per card in parallel
+                # and tabulated locally instead of generated in one long answer
+                card_ids = plan_comparison(user_prompt) if route == COMPARISON else None
+                if card_ids:
+                    try:
+                        planned = run_coroutine(compare_cards(card_ids)).result()
+                    except Exception:
+                        planned = None  # Fall back to the full generated comparison
+                    if planned:
+                        serve_cached(planned, "", free=False)
+                        cache_answer(planned, "")
+                        return planned, ""
+                # Web enrichment is only appended to the answer, so it runs on
+                # the shared loop alongside the Gemini call instead of in front of it
+                web_future = web_flights.run(flight_key, lambda: run_coroutine(enhance_with_web_search(user_prompt)))
+                # The class's shared model, built once per process
+                st.session_state.chat_session.model = model_providers[route].get()
+                # Older turns are sent as a summary so the prompt stays within budget
+                history = st.session_state.chat_session.history
+                compacted = compact_history(history)
+                if compacted is not history:
+                    st.session_state.chat_session.history = compacted
+                # Partial JSON cannot be shown, so structured answers are rendered whole
+                if STREAM_RESPONSES and not STRUCTURED_RESPONSES:
+                    return stream_response(web_future)
                 try:
-                    # Get web search results
-                    web_info = await enhance_with_web_search(user_prompt)
-                    
                     # Get Gemini response
+                    gemini_response = run_coroutine(
+                        st.session_state.chat_session.send_message_async(enhanced_prompt)
+                    ).result()
                 except Exception as e:
-                    st.error(f"Error getting web search results: {str(e)}")
+                    web_flights.abandon(flight_key, web_future)
+                    st.error(f"Error getting response: {str(e)}")
                     st.session_state.requests_in_minute -= 1  # Don't count failed requests
-                    return
-                gemini_response = st.session_state.chat_session.send_message(enhanced_prompt)
+                    return None
+                # Merge the web block as soon as it is ready
+                web_info = web_future.result()
+                remember_answer(gemini_response.text, web_info)
                 # Combine Gemini response with web search results
                 combined_response = gemini_response.text + web_info
                 # Display assistant response with properly formatted tables
@@ -514,4 +394,40 @@ if user_prompt:
                 except Exception as e:
                     st.error(f"Error getting response: {str(e)}")
                 st.session_state.requests_in_minute -= 1  # Don't count failed requests
-            asyncio.run(process_request())
\ No newline at end of file
+                return gemini_response.text, web_info
+            
+            async def stream_chunks(chat_session, prompt):
+                gemini_response = await chat_session.send_message_async(prompt, stream=True)
+                async for chunk in gemini_response:
+                    yield chunk.text
+            
+            def stream_response(web_future):
+                answer = None
+                chat_session = st.session_state.chat_session
+                # A stream that breaks leaves the session unable to build its
+                # history, so the history from before the request is restored
+                history_before = list(chat_session.history)
+                try:
+                    with st.chat_message("assistant"):
+                        renderer = StreamingResponseRenderer()
+                        chunks = []
+                        for text in iterate_in_loop(stream_chunks(chat_session, enhanced_prompt)):
+                            chunks.append(text)
+                            renderer.feed(text)
+                        # Raises if the stream stopped early, e.g. for safety
+                        chat_session.history
+                        # Merge the web block once the answer has finished streaming
+                        web_info = web_future.result()
+                        renderer.feed(web_info)
+                        renderer.finish()
+                    answer = "".join(chunks), web_info
+                    remember_answer(*answer)
+                except Exception as e:
+                    chat_session.history = history_before
+                    web_flights.abandon(flight_key, web_future)
+                    st.error(f"Error getting response: {str(e)}")
+                st.session_state.requests_in_minute -= 1  # Don't count failed requests
+                return answer
+            
+            served_locally = process_request()
+            route_stats.record(route, time.perf_counter() - request_start, local=bool(served_locally))
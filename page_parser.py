@@ -0,0 +1,145 @@
+import os
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+from relevance import get_scorer, load_vocabulary
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml  # noqa: F401  (used by BeautifulSoup's 'lxml' builder)
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+# Elements that carry card facts, and page furniture that never does
+CONTENT_TAGS = ['p', 'li', 'h2', 'h3', 'td']
+NOISE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+CARD_CONTAINER_CLASSES = ['card-details', 'product-info', 'card-comparison', 'card-benefits']
+MIN_TEXT_LENGTH = 30
+
+# Essential credit card indicators with weights
+CREDIT_CARD_INDICATORS = {
+    "reward rate": 3,
+    "cashback": 3,
+    "annual fee": 3,
+    "welcome offer": 2,
+    "lounge access": 2,
+    "credit limit": 2,
+    "joining fee": 2,
+    "benefits": 1,
+    "eligibility": 1
+}
+
+# Point RELEVANCE_VOCABULARY at a JSON/CSV/TSV file to score with a larger vocabulary
+if os.getenv("RELEVANCE_VOCABULARY"):
+    CREDIT_CARD_INDICATORS = load_vocabulary(os.getenv("RELEVANCE_VOCABULARY"))
+
+# Parse only what extraction looks at: the title, content tags, candidate
+# card containers, and noise tags (kept so their content can be dropped)
+CONTENT_STRAINER = SoupStrainer(['title', 'div'] + CONTENT_TAGS + NOISE_TAGS)
+
+# Set HTML_PARSER to force a backend; "auto" picks the fastest installed one
+PARSER_BACKEND = os.getenv("HTML_PARSER", "auto")
+
+def _is_card_container(class_value):
+    return class_value and any(term in class_value.lower() for term in CARD_CONTAINER_CLASSES)
+
+def _soup_texts(soup):
+    """Title and candidate texts from a BeautifulSoup tree"""
+    # Quick cleanup
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+
+    # Find credit card specific content
+    card_content = soup.find('div', class_=_is_card_container) or soup
+    texts = [elem.get_text(strip=True) for elem in card_content.find_all(CONTENT_TAGS)]
+    title = soup.title.string if soup.title else ""
+    return title or "", texts
+
+def _parse_html_parser(html):
+    return _soup_texts(BeautifulSoup(html, 'html.parser'))
+
+def _parse_lxml(html):
+    return _soup_texts(BeautifulSoup(html, 'lxml'))
+
+def _parse_lxml_strained(html):
+    return _soup_texts(BeautifulSoup(html, 'lxml', parse_only=CONTENT_STRAINER))
+
+def _parse_selectolax(html):
+    tree = HTMLParser(html)
+    title_node = tree.css_first('title')
+    title = title_node.text() if title_node else ""
+    tree.strip_tags(NOISE_TAGS)
+
+    card_content = next(
+        (div for div in tree.css('div') if _is_card_container(div.attributes.get('class'))),
+        tree.root
+    )
+    if card_content is None:
+        return title, []
+    # css() with a selector list groups matches by selector; traverse() keeps document order
+    texts = [node.text(strip=True) for node in card_content.traverse() if node.tag in CONTENT_TAGS]
+    return title, texts
+
+# Backend name -> html -> (raw title, element texts in document order)
+BACKENDS = {'html.parser': _parse_html_parser}
+if HAVE_LXML:
+    BACKENDS['lxml'] = _parse_lxml
+    BACKENDS['lxml-strained'] = _parse_lxml_strained
+if HTMLParser is not None:
+    BACKENDS['selectolax'] = _parse_selectolax
+
+def default_backend():
+    """The configured backend, or the fastest one installed"""
+    if PARSER_BACKEND in BACKENDS:
+        return PARSER_BACKEND
+    for name in ('selectolax', 'lxml-strained', 'html.parser'):
+        if name in BACKENDS:
+            return name
+
+def clean_title(title):
+    """Collapse whitespace and drop the site name after '|' or '-'"""
+    title = re.sub(r'\s+', ' ', title).strip()
+    return re.sub(r'^(.*?)\s*[|\-]\s*.*$', r'\1', title)
+
+def extract_passages(html, backend=None):
+    """Cleaned title and every content element long enough to carry card facts"""
+    title, elements = BACKENDS[backend or default_backend()](html)
+    return clean_title(title), [text for text in elements if text and len(text) > MIN_TEXT_LENGTH]
+
+def score_text(text, credit_card_indicators):
+    """Relevance score of one element's text"""
+    return get_scorer(credit_card_indicators).score(text)
+
+def snippet_from_passages(title, passages, link, credit_card_indicators):
+    """Combine the two most relevant passages into a snippet dict, or None"""
+    scorer = get_scorer(credit_card_indicators)
+    texts = []
+    for text in passages:
+        score = scorer.score(text)
+        if score > 0:
+            texts.append((text, score))
+
+    if texts:
+        # Sort by relevance score and combine top snippets
+        texts.sort(key=lambda x: x[1], reverse=True)
+        best_snippets = [text for text, _ in texts[:2]]
+
+        return {
+            "title": title,
+            "link": link,
+            "snippet": " | ".join(best_snippets)[:250],
+            "relevance_score": sum(score for _, score in texts[:2])
+        }
+    return None
+
+def extract_snippet(html, link, credit_card_indicators, backend=None):
+    """Pick the most relevant text from a card page; returns None if nothing matches"""
+    try:
+        title, passages = extract_passages(html, backend)
+        return snippet_from_passages(title, passages, link, credit_card_indicators)
+    except Exception:
+        return None
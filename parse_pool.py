@@ -0,0 +1,87 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from page_parser import extract_snippet
+
+# Parsing and scoring are CPU-bound, so they run in worker processes and the
+# event loop only does I/O. PARSE_WORKERS=0 parses inline on the loop.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Pages waiting for a worker are held in memory, so cap how many are queued
+MAX_PENDING_PER_WORKER = 2
+
+_lock = threading.Lock()
+_start_lock = threading.Lock()
+_executor = None
+_semaphore = None
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    """A spawned parse worker that does not re-run the launching script
+
+    Under `streamlit run` the page script is installed as __main__, and spawn
+    would execute all of it in every worker. Workers only need page_parser,
+    so __main__'s file is hidden while the worker is started.
+    """
+
+    def start(self):
+        main = sys.modules["__main__"]
+        with _start_lock:
+            path = main.__dict__.pop("__file__", None)
+            try:
+                super().start()
+            finally:
+                if path is not None:
+                    main.__file__ = path
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    Process = _WorkerProcess
+
+def get_executor():
+    """The shared process pool, created on first use"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn rather than fork: the server process is multi-threaded
+            _executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=_WorkerContext(),
+            )
+        return _executor
+
+def _reset_executor():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def extract_snippet_async(html, link, credit_card_indicators):
+    """extract_snippet() in the process pool; must be awaited on the shared loop"""
+    global _semaphore
+    if PARSE_WORKERS <= 0:
+        return extract_snippet(html, link, credit_card_indicators)
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PARSE_WORKERS * MAX_PENDING_PER_WORKER)
+
+    loop = asyncio.get_running_loop()
+    async with _semaphore:
+        try:
+            return await loop.run_in_executor(
+                get_executor(), extract_snippet, html, link, credit_card_indicators
+            )
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time and parse this page inline
+            _reset_executor()
+            return extract_snippet(html, link, credit_card_indicators)
+
+def _shutdown():
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(_shutdown)
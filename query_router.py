@@ -0,0 +1,176 @@
+"""Route each question to a model tier, output budget and answer template by its class
+
+Questions are classified locally, without a model call, into fact lookups,
+single-card reviews, comparisons and recommendations. Fact lookups the card
+catalog can answer are served without any generation.
+"""
+import re
+import threading
+from collections import defaultdict, deque
+from card_catalog import REWARD_CATEGORIES, CATEGORY_KEYWORDS, get_catalog, single_card_id
+from card_resolver import get_resolver
+
+FACT = "fact"
+REVIEW = "review"
+COMPARISON = "comparison"
+RECOMMENDATION = "recommendation"
+
+REVIEW_TEMPLATE = """
+
+IMPORTANT: Always provide comprehensive responses following this exact structure for card reviews and comparisons:
+
+1. Start with a brief introduction
+2. Follow the section headers exactly:
+   - ## Key Features and Benefits
+   - ## Milestone Benefits
+   - ## Reward Structure (with table)
+   - ## Fees and Charges (with table)
+   - ## Eligibility Criteria
+   - ## Current Updates
+   - ## Comparison with Other Cards (with table)
+   - ## Who Should Apply
+   - ## When Not to Apply
+   - ## Conclusion
+   - ## Additional Tips
+
+3. Use tables for all numerical comparisons
+4. Include specific numbers and current data
+5. End with actionable recommendations"""
+
+COMPARISON_TEMPLATE = """
+
+IMPORTANT: Answer comparisons with the Basic Features, Reward Rates, Additional Benefits and Best Suited For tables only, followed by a two-sentence verdict."""
+
+RECOMMENDATION_TEMPLATE = """
+
+IMPORTANT: Recommend at most three cards. Give a Best Suited For table, then one short paragraph per card on why it fits and its main drawback."""
+
+FACT_TEMPLATE = """
+
+IMPORTANT: Answer factual questions directly in one or two sentences with the exact figure and any condition attached to it. Do not add sections or tables."""
+
+# Model tier, output-token cap and template per class; flash-lite has no
+# context caching, so its instruction is always sent per request
+ROUTES = {
+    FACT: {"model": "gemini-2.0-flash-lite", "cached_model": None,
+           "max_output_tokens": 512, "template": FACT_TEMPLATE},
+    REVIEW: {"model": "gemini-2.0-flash", "cached_model": "models/gemini-2.0-flash-001",
+             "max_output_tokens": 8192, "template": REVIEW_TEMPLATE},
+    COMPARISON: {"model": "gemini-2.0-flash", "cached_model": "models/gemini-2.0-flash-001",
+                 "max_output_tokens": 8192, "template": COMPARISON_TEMPLATE},
+    RECOMMENDATION: {"model": "gemini-2.0-flash", "cached_model": "models/gemini-2.0-flash-001",
+                     "max_output_tokens": 4096, "template": RECOMMENDATION_TEMPLATE},
+}
+
+COMPARISON_RE = re.compile(r'\b(?:vs\.?|versus|compare|comparison|difference between|better than)\b', re.I)
+RECOMMENDATION_RE = re.compile(
+    r'\b(?:best|top|which card|suggest|recommend|should i|good for|for my|i spend|options for)\b', re.I
+)
+REVIEW_RE = re.compile(r'\b(?:review|tell me about|worth it|pros and cons|details of|explain)\b', re.I)
+
+# Catalog facts a question can ask for, with the words that ask for them
+FACT_PATTERNS = (
+    ("joining_fee", re.compile(r'\bjoining fee\b', re.I)),
+    ("fee_waiver_spend", re.compile(r'\b(?:fee waiver|waive[drs]?|waiver)\b', re.I)),
+    ("annual_fee", re.compile(r'\b(?:annual|renewal|yearly) fee\b|\bfees?\b', re.I)),
+    ("lounge_visits", re.compile(r'\blounge', re.I)),
+    ("min_income", re.compile(r'\b(?:income|salary|eligib)', re.I)),
+    ("reward_rate", re.compile(r'\b(?:reward rate|cashback|cash back|value back|reward points?|rewards? on)\b', re.I)),
+)
+# Fact questions are short; longer ones want context around the figure
+MAX_FACT_WORDS = 16
+
+def fact_asked(prompt):
+    """The catalog fact a question asks for, or None"""
+    return next((fact for fact, pattern in FACT_PATTERNS if pattern.search(prompt)), None)
+
+def classify(prompt):
+    """FACT, REVIEW, COMPARISON or RECOMMENDATION"""
+    cards = get_resolver().resolve(prompt)
+    if len(cards) > 1 or COMPARISON_RE.search(prompt):
+        return COMPARISON
+    if len(cards) == 1:
+        if fact_asked(prompt) and len(prompt.split()) <= MAX_FACT_WORDS and not REVIEW_RE.search(prompt):
+            return FACT
+        return REVIEW
+    # A card the resolver does not know yet, as opposed to a group of cards
+    if REVIEW_RE.search(prompt) and not RECOMMENDATION_RE.search(prompt) and not re.search(r'\bcards\b', prompt, re.I):
+        return REVIEW
+    return RECOMMENDATION
+
+def _rupees(amount):
+    return "nil" if amount == 0 else f"₹{amount:,.0f}"
+
+def answer_fact(prompt):
+    """A catalog-backed answer to a fact question, or None if the catalog lacks the figure"""
+    cards = get_resolver().resolve(prompt)
+    fact = fact_asked(prompt)
+    if len(cards) != 1 or fact is None:
+        return None
+    record = get_catalog().get(cards[0])
+    # Catalogs built before listing pages were filtered may still hold them
+    if record is None or single_card_id(record.name) != record.card_id:
+        return None
+
+    name = record.name
+    if fact == "reward_rate":
+        lowered = prompt.lower()
+        category = next(
+            (category for category in REWARD_CATEGORIES[1:]
+             if any(keyword in lowered for keyword in CATEGORY_KEYWORDS[category])),
+            "general"
+        )
+        rate = record.rate(category)
+        if rate is None:
+            return None
+        answer = f"The {name} earns {rate:g}% back on {category} spends."
+    else:
+        value = getattr(record, fact)
+        if value is None:
+            return None
+        answer = {
+            "annual_fee": f"The annual fee of the {name} is {_rupees(value)} (plus GST).",
+            "joining_fee": f"The joining fee of the {name} is {_rupees(value)} (plus GST).",
+            "fee_waiver_spend": f"The {name}'s annual fee is waived on annual spends of {_rupees(value)}.",
+            "lounge_visits": f"The {name} includes {value:g} complimentary airport lounge visits a year.",
+            "min_income": f"The {name} requires an income of about {_rupees(value)}.",
+        }[fact]
+    if record.source_url:
+        answer += f"\n\nSource: [{record.source_url}]({record.source_url})"
+    return answer
+
+# Latency samples kept per class
+LATENCY_WINDOW = 1000
+
+class RouteStats:
+    """Recent end-to-end latency per query class"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._local = defaultdict(int)
+
+    def record(self, route, seconds, local=False):
+        with self._lock:
+            self._latencies[route].append(seconds)
+            if local:
+                self._local[route] += 1
+
+    def summary(self):
+        """Count and p50/p95/max latency in milliseconds per class"""
+        with self._lock:
+            samples = {route: sorted(latencies) for route, latencies in self._latencies.items()}
+            local = dict(self._local)
+        return {
+            route: {
+                "count": len(values),
+                "served_locally": local.get(route, 0),
+                "p50_ms": round(values[len(values) // 2] * 1000),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000),
+                "max_ms": round(values[-1] * 1000),
+            }
+            for route, values in samples.items()
+        }
+
+# Shared by every session in the process
+route_stats = RouteStats()
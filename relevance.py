@@ -0,0 +1,91 @@
+import csv
+import json
+import re
+from functools import lru_cache
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+def _trie_pattern(terms):
+    """Regex source for a trie of terms, so shared prefixes are matched once"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True  # End of a term
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A shorter term ends here; prefer the longer one when it matches
+            body = '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+class RelevanceScorer:
+    """Scores text against a weighted vocabulary in a single pass
+
+    Each term present in the text contributes its weight once, exactly like
+    summing the weight of every term with `term in text.lower()`.
+    """
+
+    def __init__(self, weights):
+        self.weights = {term.lower(): weight for term, weight in weights.items() if term}
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for term in self.weights:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            # The lookahead finds the longest term starting at each position;
+            # shorter terms starting there are its prefixes, added below
+            self._pattern = re.compile('(?=(' + _trie_pattern(self.weights) + '))')
+            self._prefixes = {
+                term: [other for other in self.weights if term.startswith(other)]
+                for term in self.weights
+            }
+
+    def matches(self, text):
+        """The set of vocabulary terms that occur in text"""
+        if not self.weights or not text:
+            return set()
+        lowered = text.lower()
+        if self._automaton is not None:
+            return {term for _, term in self._automaton.iter(lowered)}
+        found = set()
+        for longest in {m.group(1) for m in self._pattern.finditer(lowered)}:
+            found.update(self._prefixes[longest])
+        return found
+
+    def score(self, text):
+        return sum(self.weights[term] for term in self.matches(text))
+
+@lru_cache(maxsize=16)
+def _cached_scorer(items):
+    return RelevanceScorer(dict(items))
+
+def get_scorer(weights):
+    """Compiled scorer for a weights dict, built once per process"""
+    return _cached_scorer(tuple(sorted(weights.items())))
+
+def load_vocabulary(path):
+    """Read term weights from JSON ({term: weight}) or CSV/TSV (term, weight) rows"""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return {term: float(weight) for term, weight in json.load(f).items()}
+
+    weights = {}
+    with open(path, encoding='utf-8', newline='') as f:
+        delimiter = '\t' if path.endswith('.tsv') else ','
+        for row in csv.reader(f, delimiter=delimiter):
+            if len(row) >= 2 and row[0].strip() and not row[0].startswith('#'):
+                weights[row[0].strip()] = float(row[1])
+    return weights
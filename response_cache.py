@@ -0,0 +1,198 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from card_resolver import get_resolver
+from storage import data_path
+from vector_index import vector_index
+
+# Answers quote live card offers, so they expire well before the page cache
+RESPONSE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(6 * 3600)))  # Seconds
+RESPONSE_MAX_ENTRIES = 2000
+# Keep answers across restarts in data/response_cache.sqlite3
+RESPONSE_CACHE_ON_DISK = os.getenv("RESPONSE_CACHE_ON_DISK", "false").lower() == "true"
+
+def normalize_prompt(prompt):
+    """Cache key for a prompt: lower-cased words, punctuation and spacing ignored"""
+    return " ".join(re.findall(r'[a-z0-9₹%]+', prompt.lower()))
+
+class ResponseCache:
+    """TTL + LRU cache of complete answers, keyed by normalized prompt"""
+
+    def __init__(self, ttl=RESPONSE_TTL, max_entries=RESPONSE_MAX_ENTRIES, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (answer, web_info, expires_at)
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    answer TEXT,
+                    web_info TEXT,
+                    expires_at REAL
+                )
+            """)
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            for key, answer, web_info, expires_at in self._db.execute(
+                "SELECT key, answer, web_info, expires_at FROM responses ORDER BY expires_at"
+            ):
+                self._entries[key] = (answer, web_info, expires_at)
+            self._evict()
+
+    def get(self, prompt):
+        """(answer, web_info) cached for the prompt, or None"""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[2] <= time.time():
+                self._drop(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0], entry[1]
+
+    def store(self, prompt, answer, web_info):
+        key = normalize_prompt(prompt)
+        if not key or not answer:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (answer, web_info, expires_at)
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, answer, web_info, expires_at)
+                )
+                self._db.commit()
+            self._evict()
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used answers beyond max_entries"""
+        while len(self._entries) > self.max_entries:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self._stats["evictions"] += 1
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def create_response_cache():
+    return ResponseCache(path=data_path("response_cache.sqlite3") if RESPONSE_CACHE_ON_DISK else None)
+
+# Cosine similarity a cached prompt needs to answer a paraphrase of it
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_MAX_ENTRIES = 2000
+
+def prompt_guard(prompt):
+    """Facts a paraphrase must share with a cached prompt: the cards and numbers it names
+
+    'HDFC Regalia review' and 'HDFC Regalia Gold review' embed almost
+    identically but are different questions.
+    """
+    return tuple(get_resolver().resolve(prompt)), tuple(sorted(re.findall(r'\d+(?:\.\d+)?', prompt)))
+
+class SemanticResponseCache:
+    """Nearest-neighbour answer cache over prompt embeddings, with TTL + LRU eviction"""
+
+    def __init__(self, encode, threshold=SEMANTIC_THRESHOLD, ttl=RESPONSE_TTL,
+                 max_entries=SEMANTIC_MAX_ENTRIES, guard=prompt_guard):
+        self.encode = encode
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.guard = guard
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (vector, guard, answer, web_info, expires_at)
+        self._matrix = None  # Stacked vectors of _entries, rebuilt after changes
+        self._keys = []
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _embed(self, prompt):
+        return self.encode([normalize_prompt(prompt)])[0]
+
+    def lookup(self, prompt):
+        """(answer, web_info, similarity) of the closest cached prompt above the threshold, or None"""
+        vector = self._embed(prompt)
+        guard = self.guard(prompt)
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[4] <= now]:
+                del self._entries[key]
+                self._matrix = None
+            if self._entries and self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[key][0] for key in self._keys])
+            if self._entries:
+                scores = self._matrix @ vector
+                # Best match among cached prompts about the same cards and numbers
+                for i in np.argsort(-scores):
+                    if scores[i] < self.threshold:
+                        break
+                    key = self._keys[i]
+                    entry = self._entries[key]
+                    if entry[1] == guard:
+                        self._entries.move_to_end(key)
+                        self._stats["hits"] += 1
+                        return entry[2], entry[3], float(scores[i])
+            self._stats["misses"] += 1
+            return None
+
+    def get(self, prompt):
+        """(answer, web_info) for a paraphrase of a cached prompt, or None"""
+        found = self.lookup(prompt)
+        return found[:2] if found else None
+
+    def store(self, prompt, answer, web_info):
+        key = normalize_prompt(prompt)
+        if not key or not answer:
+            return
+        vector = self._embed(prompt)
+        guard = self.guard(prompt)
+        with self._lock:
+            self._entries[key] = (vector, guard, answer, web_info, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def create_semantic_cache():
+    """Semantic cache using the corpus embedding model, or None without sentence-transformers"""
+    if not vector_index.available():
+        return None
+    return SemanticResponseCache(vector_index.encode)
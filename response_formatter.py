@@ -1,7 +1,9 @@
 import re
+import time
 import pandas as pd
 import streamlit as st
 from bs4 import BeautifulSoup
+from structured_response import parse_structured, table_rows
 
 def convert_html_to_markdown(html):
     """Convert HTML formatting to markdown with enhanced text cleaning"""
@@ -124,11 +126,77 @@ def format_table(table_html):
         print(f"Error formatting table: {e}")
         return None
 
+def render_table_part(table_html, target=st):
+    """Render an HTML table chunk as a styled DataFrame"""
+    df = format_table(table_html)
+    if df is not None:
+        render_dataframe(df, target)
+
+def render_dataframe(df, target=st):
+    """Render a DataFrame in the dark table style"""
+    # Apply custom styling with dark theme
+    target.markdown("""
+    <style>
+    .stDataFrame {
+        background-color: #262730 !important;
+        color: #FAFAFA !important;
+    }
+    .stDataFrame th {
+        background-color: #1E1E1E !important;
+        color: #FAFAFA !important;
+        font-weight: bold !important;
+    }
+    .stDataFrame tr:nth-child(even) {
+        background-color: #262730 !important;
+    }
+    .stDataFrame tr:nth-child(odd) {
+        background-color: #1E1E1E !important;
+    }
+    .stDataFrame tr:hover {
+        background-color: #0E1117 !important;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+    
+    target.dataframe(
+        df.style.set_properties(**{
+            'color': '#FAFAFA',
+            'background-color': '#262730',
+        }),
+        hide_index=True, 
+        use_container_width=True
+    )
+
+def render_text_part(text, target=st):
+    """Render a non-table chunk; target may be a placeholder that is re-rendered"""
+    # Clean up and convert HTML to plain text
+    render_markdown_block(convert_html_to_markdown(text), target)
+
+def render_markdown_block(cleaned_text, target=st):
+    """Render markdown in the dark text style"""
+    target.markdown(f"""
+    <div style="
+        background-color: #262730; 
+        color: #FAFAFA; 
+        padding: 15px; 
+        border-radius: 5px; 
+        margin-bottom: 10px;
+    ">
+    {cleaned_text}
+    </div>
+    """, unsafe_allow_html=True)
+
 def format_and_render_response(text):
     """Format and render the response with enhanced handling"""
     if not text:
         return
     
+    # Structured answers carry their tables as cells already
+    structured = parse_structured(text)
+    if structured:
+        answer, text = structured
+        render_structured(answer)
+    
     # Split into tables and non-tables
     parts = re.split(r'(<table.*?</table>)', text, flags=re.DOTALL)
     
@@ -139,53 +207,104 @@ def format_and_render_response(text):
         
         if part.startswith('<table'):
             # Handle table
-            df = format_table(part)
-            if df is not None:
-                # Apply custom styling with dark theme
-                st.markdown("""
-                <style>
-                .stDataFrame {
-                    background-color: #262730 !important;
-                    color: #FAFAFA !important;
-                }
-                .stDataFrame th {
-                    background-color: #1E1E1E !important;
-                    color: #FAFAFA !important;
-                    font-weight: bold !important;
-                }
-                .stDataFrame tr:nth-child(even) {
-                    background-color: #262730 !important;
-                }
-                .stDataFrame tr:nth-child(odd) {
-                    background-color: #1E1E1E !important;
-                }
-                .stDataFrame tr:hover {
-                    background-color: #0E1117 !important;
-                }
-                </style>
-                """, unsafe_allow_html=True)
-                
-                st.dataframe(
-                    df.style.set_properties(**{
-                        'color': '#FAFAFA',
-                        'background-color': '#262730',
-                    }),
-                    hide_index=True, 
-                    use_container_width=True
-                )
+            render_table_part(part)
         else:
-            # Clean up and convert HTML to plain text
-            cleaned_text = convert_html_to_markdown(part)
-            
-            # Custom rendering with dark theme
-            st.markdown(f"""
-            <div style="
-                background-color: #262730; 
-                color: #FAFAFA; 
-                padding: 15px; 
-                border-radius: 5px; 
-                margin-bottom: 10px;
-            ">
-            {cleaned_text}
-            </div>
-            """, unsafe_allow_html=True)
\ No newline at end of file
+            render_text_part(part)
+
+def render_structured(answer, target=st):
+    """Render a structured answer's sections, with its tables straight into DataFrames"""
+    if answer.get("intro"):
+        render_markdown_block(answer["intro"], target)
+    for section in answer["sections"]:
+        if not isinstance(section, dict):
+            continue
+        if section.get("heading"):
+            target.markdown(f"## {section['heading']}")
+        if section.get("text"):
+            render_markdown_block(section["text"], target)
+        if isinstance(section.get("table"), dict):
+            columns, rows = table_rows(section["table"])
+            if columns and rows:
+                render_dataframe(pd.DataFrame(rows, columns=columns), target)
+
+def _stable_length(text):
+    """Length of the prefix that can be shown without cutting a table in half"""
+    # Hold back a '<table' tag that is still arriving
+    for size in range(len('<table') - 1, 0, -1):
+        if text.endswith('<table'[:size]):
+            return len(text) - size
+    
+    # Hold back a markdown table that may still gain rows; the last line is
+    # incomplete, so a blank or '|' line there means the table is still open
+    lines = text.split('\n')
+    current = lines[-1].lstrip()
+    if current and not current.startswith('|'):
+        return len(text)
+    first = len(lines) - 1
+    while first > 0 and lines[first - 1].lstrip().startswith('|'):
+        first -= 1
+    if first == len(lines) - 1 and not current:
+        return len(text)
+    return sum(len(line) + 1 for line in lines[:first])
+
+class StreamingResponseRenderer:
+    """Render a response chunk by chunk, producing the same parts as format_and_render_response
+    
+    Text is re-rendered into a placeholder as it arrives, while partial
+    <table> and markdown table regions are held back until they close.
+    """
+    
+    def __init__(self, container=None, min_interval=0.1):
+        self.container = container if container is not None else st.container()
+        self.min_interval = min_interval  # Throttle re-rendering of long text runs
+        self.text = ""
+        self._run_start = 0
+        self._placeholder = None
+        self._last_render = 0.0
+    
+    def feed(self, chunk):
+        """Append a streamed chunk and render whatever is safe to show"""
+        if chunk:
+            self.text += chunk
+            self._flush(final=False)
+    
+    def finish(self):
+        """Render everything still buffered and return the full text"""
+        self._flush(final=True)
+        return self.text
+    
+    def _flush(self, final):
+        while True:
+            start = self.text.find('<table', self._run_start)
+            if start == -1:
+                break
+            end = self.text.find('</table>', start)
+            if end == -1:
+                if final:
+                    # Never closed, so the non-streamed path treats it as text
+                    break
+                # Show the text leading up to the table while it streams in
+                self._render_run(self.text[self._run_start:start], force=False)
+                return
+            end += len('</table>')
+            self._render_run(self.text[self._run_start:start], force=True)
+            with self.container:
+                render_table_part(self.text[start:end])
+            self._placeholder = None
+            self._run_start = end
+        
+        tail = self.text[self._run_start:]
+        if not final:
+            tail = tail[:_stable_length(tail)]
+        self._render_run(tail, force=final)
+    
+    def _render_run(self, text, force):
+        if not text.strip():
+            return
+        now = time.monotonic()
+        if not force and now - self._last_render < self.min_interval:
+            return
+        if self._placeholder is None:
+            self._placeholder = self.container.empty()
+        render_text_part(text.strip(), self._placeholder)
+        self._last_render = now
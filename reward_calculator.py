@@ -0,0 +1,181 @@
+"""Net annual value of every catalog card for a monthly spend profile
+
+All cards are evaluated at once as array operations over the catalog's
+columns: rewards per category (capped), milestone bonuses, and the annual
+fee unless the spend earns a waiver.
+"""
+import re
+import threading
+import numpy as np
+from card_catalog import REWARD_CATEGORIES, CATEGORY_KEYWORDS, get_catalog
+
+# Marks the calculator's figures appended to a user prompt
+GROUNDING_MARKER = "\n\n---\nReward calculation from the card catalog"
+
+GROUNDING_TOP_K = 5
+
+class RewardCalculator:
+    """Vectorised net-value calculation over a CardCatalog"""
+
+    def __init__(self, catalog):
+        card_ids, columns = catalog.columns()
+        self.card_ids = card_ids
+        self.names = [catalog.get(card_id).name for card_id in card_ids]
+        self.sources = [catalog.get(card_id).source_url for card_id in card_ids]
+
+        # Categories without a stated rate earn the card's general rate
+        rates = columns["reward_rates"]
+        rates = np.where(np.isnan(rates), rates[:, :1], rates)
+        self.rates = np.nan_to_num(rates, nan=0.0) / 100
+
+        # Everything is annual from here on; unknown limits never bind
+        self.caps = np.nan_to_num(columns["reward_caps"] * 12, nan=np.inf)
+        self.total_caps = np.nan_to_num(columns["monthly_reward_cap"] * 12, nan=np.inf)
+        self.annual_fees = np.nan_to_num(columns["annual_fee"], nan=0.0)
+        self.waiver_spends = np.nan_to_num(columns["fee_waiver_spend"], nan=np.inf)
+        self.milestone_spends = np.nan_to_num(columns["milestone_spend"], nan=np.inf)
+        self.milestone_bonuses = np.nan_to_num(columns["milestone_bonus"], nan=0.0)
+        self.min_incomes = np.nan_to_num(columns["min_income"], nan=0.0)
+
+    def __len__(self):
+        return len(self.card_ids)
+
+    def breakdown(self, spend):
+        """Components of annual value for spend profiles
+
+        spend is a monthly ₹ vector aligned with REWARD_CATEGORIES, or a
+        k x len(REWARD_CATEGORIES) matrix of profiles. Returns a dict of
+        k x n_cards arrays: rewards, milestones, fees and net.
+        """
+        annual = np.atleast_2d(np.asarray(spend, dtype=np.float64)) * 12
+        rewards = np.minimum(annual[:, None, :] * self.rates, self.caps).sum(axis=2)
+        rewards = np.minimum(rewards, self.total_caps)
+        total = annual.sum(axis=1, keepdims=True)
+        milestones = np.where(total >= self.milestone_spends, self.milestone_bonuses, 0.0)
+        fees = np.where(total >= self.waiver_spends, 0.0, self.annual_fees)
+        return {
+            "rewards": rewards,
+            "milestones": milestones,
+            "fees": fees,
+            "net": rewards + milestones - fees,
+        }
+
+    def eligible(self, incomes):
+        """k x n_cards mask of cards whose income requirement each annual income meets"""
+        return np.asarray(incomes, dtype=np.float64)[:, None] >= self.min_incomes
+
+    def net_value(self, spend):
+        """Net annual value per card (k x n_cards, or n_cards for a single profile)"""
+        net = self.breakdown(spend)["net"]
+        return net[0] if np.ndim(spend) == 1 else net
+
+    def top_k(self, spend, k=GROUNDING_TOP_K):
+        """The k most valuable cards for one monthly spend profile, best first"""
+        if not len(self):
+            return []
+        parts = {name: values[0] for name, values in self.breakdown(spend).items()}
+        net = parts["net"]
+        k = min(k, len(net))
+        top = np.argpartition(-net, k - 1)[:k]
+        top = top[np.argsort(-net[top])]
+        return [
+            {
+                "card_id": self.card_ids[i],
+                "name": self.names[i],
+                "source_url": self.sources[i],
+                **{name: float(values[i]) for name, values in parts.items()},
+            }
+            for i in top
+        ]
+
+_calculator = None
+_calculator_catalog = None
+_calculator_lock = threading.Lock()
+
+def get_calculator():
+    """Calculator for the current catalog, rebuilt when the catalog is reloaded"""
+    global _calculator, _calculator_catalog
+    catalog = get_catalog()
+    with _calculator_lock:
+        if _calculator_catalog is not catalog:
+            _calculator = RewardCalculator(catalog)
+            _calculator_catalog = catalog
+        return _calculator
+
+# Spend mentions: "₹10,000 on dining", "dining 10k", "5000 a month for fuel"
+SPEND_AMOUNT_RE = re.compile(r'(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|l\b|k\b)?', re.I)
+ANNUAL_WORDS = ("per year", "a year", "yearly", "annually", "per annum", "/year", "/yr")
+OTHER_SPEND_WORDS = ("other", "rest", "misc", "everything else")
+# A question describes spending only if it says so ("under 1000 fee" does not)
+SPEND_WORDING_RE = re.compile(
+    r'\bspen(?:d|ds|ding|t)\b|\bper month\b|\ba month\b|\bmonthly\b|/\s?(?:month|mo)\b|\bp\.?m\.?(?!\w)|'
+    + "|".join(re.escape(word) for word in ANNUAL_WORDS)
+)
+# Amounts next to these words are fees, limits or income, not spend
+NOT_SPEND_RE = re.compile(r'\b(?:fees?|charges?|income|salary|ctc|lpa|limit|joining|renewal)\b')
+NOT_SPEND_WINDOW = 20  # Characters either side of an amount
+
+def _rupees(number, unit):
+    value = float(number.replace(",", ""))
+    unit = (unit or "").lower()
+    if unit.startswith("l"):
+        value *= 100000
+    elif unit == "k":
+        value *= 1000
+    return value
+
+def spend_from_text(text):
+    """Monthly spend vector aligned with REWARD_CATEGORIES, or None if no spend is described"""
+    if not SPEND_WORDING_RE.search(text.lower()):
+        return None
+    spend = np.zeros(len(REWARD_CATEGORIES))
+    found = False
+    # One amount per clause, attributed to the category named in the same clause
+    for clause in re.split(r',(?!\d{2})|[;\n]|\band\b|\.(?!\d)', text.lower()):
+        categories = [
+            i for i, category in enumerate(REWARD_CATEGORIES)
+            if any(keyword in clause for keyword in CATEGORY_KEYWORDS[category])
+        ]
+        if not categories and any(word in clause for word in OTHER_SPEND_WORDS):
+            categories = [0]
+        amounts = [
+            _rupees(match.group(1), match.group(2))
+            for match in SPEND_AMOUNT_RE.finditer(clause)
+            if not NOT_SPEND_RE.search(clause[max(0, match.start() - NOT_SPEND_WINDOW):match.end() + NOT_SPEND_WINDOW])
+        ]
+        # Bare small numbers are counts ("2 cards"), not rupees
+        amounts = [amount for amount in amounts if amount >= 100]
+        if len(categories) != 1 or not amounts:
+            continue
+        amount = amounts[0]
+        if any(word in clause for word in ANNUAL_WORDS):
+            amount /= 12
+        spend[categories[0]] += amount
+        found = True
+    return spend if found else None
+
+def grounding_context(prompt, k=GROUNDING_TOP_K):
+    """Calculator results to append to the prompt, or "" if it describes no spend"""
+    spend = spend_from_text(prompt)
+    if spend is None:
+        return ""
+    calculator = get_calculator()
+    results = calculator.top_k(spend, k)
+    if not results:
+        return ""
+    profile = ", ".join(
+        f"{category} ₹{amount:,.0f}" for category, amount in zip(REWARD_CATEGORIES, spend) if amount
+    )
+    lines = [
+        GROUNDING_MARKER,
+        f"Monthly spend: {profile}. Net annual value = capped rewards + milestone bonuses"
+        " - annual fee (unless the spend earns a waiver), from the cards' published terms:",
+    ]
+    for rank, result in enumerate(results, 1):
+        lines.append(
+            f"{rank}. {result['name']}: ₹{result['net']:,.0f}/year "
+            f"(rewards ₹{result['rewards']:,.0f}, milestones ₹{result['milestones']:,.0f}, "
+            f"fee ₹{result['fees']:,.0f})"
+        )
+    lines.append("Use these figures when ranking cards for this spend.")
+    return "\n".join(lines)
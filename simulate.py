@@ -0,0 +1,178 @@
+"""Precompute the best cards for a grid of spend personas
+
+A persona is an annual income, a total monthly spend and a category mix.
+Every persona is scored against every catalog card with the reward
+calculator, a chunk of personas at a time across a process pool, and the
+top cards per persona are streamed to a Parquet file.
+
+    python simulate.py
+    python simulate.py --incomes 300000 1200000 --spends 25000 75000 --mixes mixes.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from card_catalog import REWARD_CATEGORIES, CardCatalog, build_catalog, get_catalog
+from reward_calculator import RewardCalculator
+from storage import data_path
+
+DEFAULT_INCOMES = (300000, 600000, 1200000, 2400000, 5000000)
+DEFAULT_SPENDS = (10000, 25000, 50000, 100000, 200000)
+
+# Share of monthly spend per category; categories left out get nothing
+DEFAULT_MIXES = {
+    "balanced": {"general": 0.4, "dining": 0.1, "travel": 0.1, "shopping": 0.15,
+                 "fuel": 0.1, "groceries": 0.1, "utilities": 0.05},
+    "foodie": {"general": 0.3, "dining": 0.35, "groceries": 0.25, "utilities": 0.1},
+    "traveller": {"general": 0.3, "travel": 0.5, "dining": 0.2},
+    "online_shopper": {"general": 0.25, "shopping": 0.6, "utilities": 0.15},
+    "commuter": {"general": 0.5, "fuel": 0.35, "utilities": 0.15},
+}
+
+# Personas per chunk; a chunk holds personas x cards x categories floats
+CHUNK_SIZE = 500
+TOP_K = 3
+
+# Fixed so a first chunk with no eligible cards cannot type mix and card_id as null
+RESULT_SCHEMA = pa.schema([
+    ("persona", pa.int64()),
+    ("income", pa.float64()),
+    ("monthly_spend", pa.float64()),
+    ("mix", pa.string()),
+    ("rank", pa.int64()),
+    ("card_id", pa.string()),
+    ("net_value", pa.float64()),
+    ("rewards", pa.float64()),
+    ("milestones", pa.float64()),
+    ("fee", pa.float64()),
+])
+
+def mix_matrix(mixes):
+    """Mix names and a normalised len(mixes) x len(REWARD_CATEGORIES) share matrix"""
+    names = list(mixes)
+    shares = np.array([[mixes[name].get(category, 0.0) for category in REWARD_CATEGORIES] for name in names],
+                      dtype=np.float64)
+    return names, shares / shares.sum(axis=1, keepdims=True)
+
+class Grid:
+    """Income x spend x mix personas, addressable by index so chunks stay small to ship"""
+
+    def __init__(self, incomes, spends, mixes):
+        self.incomes = np.asarray(incomes, dtype=np.float64)
+        self.spends = np.asarray(spends, dtype=np.float64)
+        self.mix_names, self.shares = mix_matrix(mixes)
+        self.shape = (len(self.incomes), len(self.spends), len(self.mix_names))
+
+    def __len__(self):
+        return int(np.prod(self.shape))
+
+    def personas(self, start, stop):
+        """(income indexes, spend indexes, mix indexes, monthly spend matrix) for a range of personas"""
+        income, spend, mix = np.unravel_index(np.arange(start, stop), self.shape)
+        return income, spend, mix, self.spends[spend, None] * self.shares[mix]
+
+_grid = None
+_calculator = None
+
+def _init_worker(grid, records):
+    global _grid, _calculator
+    _grid = grid
+    _calculator = RewardCalculator(CardCatalog(records))
+
+def evaluate_chunk(start, stop, top_k=TOP_K):
+    """Top cards for personas [start, stop) as Parquet-ready columns, one row per (persona, rank)"""
+    income, spend, mix, monthly = _grid.personas(start, stop)
+    parts = _calculator.breakdown(monthly)
+    # Cards the persona's income does not qualify for never rank
+    net = np.where(_calculator.eligible(_grid.incomes[income]), parts["net"], -np.inf)
+
+    k = min(top_k, net.shape[1])
+    top = np.argpartition(-net, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(net, top, axis=1), axis=1), axis=1)
+    rows = np.repeat(np.arange(stop - start), k)
+    cards = top.ravel()
+    keep = np.isfinite(net[rows, cards])
+    rows, cards = rows[keep], cards[keep]
+
+    card_ids = np.asarray(_calculator.card_ids, dtype=object)
+    return {
+        "persona": rows + start,
+        "income": _grid.incomes[income][rows],
+        "monthly_spend": _grid.spends[spend][rows],
+        "mix": np.asarray(_grid.mix_names, dtype=object)[mix][rows],
+        "rank": np.tile(np.arange(1, k + 1), stop - start)[keep],
+        "card_id": card_ids[cards],
+        "net_value": net[rows, cards],
+        "rewards": parts["rewards"][rows, cards],
+        "milestones": parts["milestones"][rows, cards],
+        "fee": parts["fees"][rows, cards],
+    }
+
+def simulate(grid, catalog, output, workers=None, chunk_size=CHUNK_SIZE, top_k=TOP_K):
+    """Evaluate every persona in the grid and write the results to output; returns rows written"""
+    records = catalog.records
+    chunks = [(start, min(start + chunk_size, len(grid))) for start in range(0, len(grid), chunk_size)]
+    written = 0
+    executor = None
+    writer = pq.ParquetWriter(output, RESULT_SCHEMA)
+    try:
+        if workers == 0:
+            _init_worker(grid, records)
+            results = (evaluate_chunk(start, stop, top_k) for start, stop in chunks)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(grid, records),
+            )
+            results = executor.map(evaluate_chunk, *zip(*chunks), [top_k] * len(chunks))
+        # Chunks arrive in order and are written as they come, so memory stays flat
+        for columns in results:
+            table = pa.table(columns, schema=RESULT_SCHEMA)
+            writer.write_table(table)
+            written += table.num_rows
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--incomes', type=float, nargs='+', default=DEFAULT_INCOMES, help='annual incomes in ₹')
+    parser.add_argument('--spends', type=float, nargs='+', default=DEFAULT_SPENDS, help='total monthly spends in ₹')
+    parser.add_argument('--mixes', help='JSON file of {name: {category: share}} (default: built-in mixes)')
+    parser.add_argument('--top', type=int, default=TOP_K, help='cards kept per persona')
+    parser.add_argument('--output', default=data_path("persona_best_cards.parquet"), help='Parquet file to write')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes; 0 runs inline')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='personas per chunk')
+    parser.add_argument('--from-cache', action='store_true',
+                        help='rebuild the catalog, including pages web search fetched live')
+    args = parser.parse_args()
+
+    mixes = DEFAULT_MIXES
+    if args.mixes:
+        with open(args.mixes, encoding='utf-8') as f:
+            mixes = json.load(f)
+    unknown = {category for mix in mixes.values() for category in mix} - set(REWARD_CATEGORIES)
+    if unknown:
+        raise SystemExit(f"Unknown categories {sorted(unknown)}; use {', '.join(REWARD_CATEGORIES)}")
+
+    catalog = build_catalog(include_http_cache=True) if args.from_cache else get_catalog()
+    if not len(catalog):
+        raise SystemExit("The card catalog is empty; run crawler.py or card_catalog.py first")
+    grid = Grid(args.incomes, args.spends, mixes)
+
+    start = time.time()
+    rows = simulate(grid, catalog, args.output, args.workers, args.chunk_size, args.top)
+    print(f"{len(grid)} personas x {len(catalog)} cards -> {rows} rows in {args.output} "
+          f"({time.time() - start:.1f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Shares one in-flight future among concurrent callers asking for the same key
+
+    The first caller for a key starts the work (or promises to resolve the
+    future itself); callers arriving before it finishes get the same future
+    instead of repeating the work. Finished keys are forgotten, so later
+    callers start afresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [future, followers]
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def _join(self, key):
+        call = self._calls.get(key)
+        if call is None:
+            return None
+        call[1] += 1
+        self._stats["followers"] += 1
+        return call[0]
+
+    def _lead(self, key, future):
+        self._calls[key] = [future, 0]
+        self._stats["leaders"] += 1
+
+    def _forget_when_done(self, key, future):
+        # Registered outside the lock: a future that is already done runs
+        # the callback at once, and _forget takes the lock itself
+        future.add_done_callback(lambda done: self._forget(key, done))
+
+    def _forget(self, key, future):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call[0] is future:
+                del self._calls[key]
+
+    def run(self, key, start):
+        """The in-flight future for key, calling start() for a new one if there is none"""
+        with self._lock:
+            future = self._join(key)
+            if future is not None:
+                return future
+            future = start()
+            self._lead(key, future)
+        self._forget_when_done(key, future)
+        return future
+
+    def begin(self, key):
+        """(future, leader): the leader must resolve the future, everyone else awaits it"""
+        with self._lock:
+            future = self._join(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._lead(key, future)
+        self._forget_when_done(key, future)
+        return future, True
+
+    def abandon(self, key, future):
+        """Cancel a future its caller no longer needs, unless other callers are waiting on it"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call[0] is future and call[1]:
+                return
+        future.cancel()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+# Shared by every session in the process
+web_flights = SingleFlight()
+answer_flights = SingleFlight()
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+
+# Local state (caches, statistics, crawled corpus) lives under one directory
+DATA_DIR = os.getenv("CARD_DATA_DIR", "data")
+
+def data_path(*parts):
+    """Path inside the data directory, creating parent directories as needed"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+def load_json(path, default):
+    """Read a JSON file, falling back to default if it is missing or corrupt"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(path, data):
+    """Write JSON atomically so a crash never leaves a half-written file"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
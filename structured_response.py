@@ -0,0 +1,92 @@
+"""Answers as typed JSON sections and tables instead of free text
+
+With STRUCTURED_RESPONSES=true the model is asked for JSON matching
+RESPONSE_SCHEMA, so tables arrive as rows of cells and render straight
+into DataFrames; text that does not parse as a structured answer takes
+the usual HTML/markdown path.
+"""
+import json
+import os
+
+# Set STRUCTURED_RESPONSES=true to request JSON answers (they are not streamed)
+STRUCTURED_RESPONSES = os.getenv("STRUCTURED_RESPONSES", "false").lower() == "true"
+
+STRING = {"type": "string"}
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intro": STRING,
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "heading": STRING,
+                    "text": STRING,
+                    "table": {
+                        "type": "object",
+                        "properties": {
+                            "columns": {"type": "array", "items": STRING},
+                            "rows": {"type": "array", "items": {"type": "array", "items": STRING}},
+                        },
+                        "required": ["columns", "rows"],
+                    },
+                },
+                "required": ["heading"],
+            },
+        },
+    },
+    "required": ["sections"],
+}
+
+STRUCTURED_TEMPLATE = """
+
+OUTPUT FORMAT: Reply in JSON. Put each section header in "heading" without '#' marks and its prose, in markdown, in "text". Put every table in the section's "table" as column headers and rows of plain cell strings, never as HTML or markdown in "text"."""
+
+def generation_config(config):
+    """config extended to request answers matching RESPONSE_SCHEMA"""
+    return {**config, "response_mime_type": "application/json", "response_schema": RESPONSE_SCHEMA}
+
+def parse_structured(text):
+    """(answer, trailing text) if text starts with a structured answer, else None
+
+    The trailing text is whatever was appended after the JSON, such as the
+    web search block.
+    """
+    text = text.lstrip()
+    if not text.startswith("{"):
+        return None
+    try:
+        answer, end = json.JSONDecoder().raw_decode(text)
+    except ValueError:
+        return None
+    if not isinstance(answer, dict) or not isinstance(answer.get("sections"), list):
+        return None
+    return answer, text[end:]
+
+def table_rows(table):
+    """(columns, rows) of a structured table, with every row padded to the same width"""
+    columns = [str(column) for column in table.get("columns") or []]
+    rows = [[str(cell) for cell in row] for row in table.get("rows") or [] if isinstance(row, list)]
+    width = max([len(columns)] + [len(row) for row in rows])
+    columns += [""] * (width - len(columns))
+    return columns, [row + [""] * (width - len(row)) for row in rows]
+
+def to_markdown(answer):
+    """Markdown rendition of a structured answer, for summaries and plain-text consumers"""
+    blocks = [answer["intro"]] if answer.get("intro") else []
+    for section in answer["sections"]:
+        if not isinstance(section, dict):
+            continue
+        if section.get("heading"):
+            blocks.append(f"## {section['heading']}")
+        if section.get("text"):
+            blocks.append(section["text"])
+        if isinstance(section.get("table"), dict):
+            columns, rows = table_rows(section["table"])
+            if columns:
+                lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+                lines += ["| " + " | ".join(cell.replace("|", "/") for cell in row) + " |" for row in rows]
+                blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
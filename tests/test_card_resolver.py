@@ -0,0 +1,24 @@
+from card_resolver import CardResolver
+
+PAGES = [
+    ("https://www.bankbazaar.com/credit-card.html", "bankbazaar.com", "Best Credit Cards in India 2025 - Compare & Apply"),
+    ("https://www.cardinsider.com/travel", "cardinsider.com", "Travel Credit Cards"),
+    ("https://www.cardinsider.com/best-travel", "cardinsider.com", "Best Travel Credit Card in India"),
+    ("https://www.hdfcbank.com/regalia-gold", "hdfcbank.com", "HDFC Regalia Gold Credit Card"),
+    ("https://www.axisbank.com/magnus", "axisbank.com", "Axis Bank Magnus Credit Card"),
+]
+
+def test_listing_pages_are_not_cards():
+    resolver = CardResolver(PAGES)
+    assert sorted(resolver.pages) == ["axis-magnus", "hdfc-regalia-gold"]
+
+def test_generic_queries_name_no_card():
+    resolver = CardResolver(PAGES)
+    assert resolver.resolve("best credit card for online shopping under 1000 fee") == []
+    assert resolver.resolve("what is the best card for travel") == []
+    assert resolver.resolve("best HDFC Regalia Gold alternatives") == ["hdfc-regalia-gold"]
+
+def test_card_names_resolve():
+    resolver = CardResolver(PAGES)
+    assert resolver.resolve("hdfc regalia gold vs axis bank magnus") == ["hdfc-regalia-gold", "axis-magnus"]
+    assert resolver.resolve("Is the Regalia Gold worth it?") == ["hdfc-regalia-gold"]
@@ -0,0 +1,28 @@
+import comparison_planner
+from card_catalog import CardCatalog, CardRecord
+from card_resolver import CardResolver
+from comparison_planner import plan_comparison
+
+PAGES = [
+    ("https://www.bankbazaar.com/credit-card.html", "bankbazaar.com", "Best Credit Cards in India 2025 - Compare & Apply"),
+    ("https://www.hdfcbank.com/regalia-gold", "hdfcbank.com", "HDFC Regalia Gold Credit Card"),
+    ("https://www.axisbank.com/magnus", "axisbank.com", "Axis Bank Magnus Credit Card"),
+    ("https://www.sbicard.com/elite", "sbicard.com", "SBI Card ELITE"),
+]
+
+def _use(monkeypatch, records):
+    catalog = CardCatalog()
+    for record in records:
+        catalog.add(record)
+    monkeypatch.setattr(comparison_planner, "get_catalog", lambda: catalog)
+    monkeypatch.setattr(comparison_planner, "get_resolver", lambda: CardResolver(PAGES))
+
+def test_plans_only_cards_with_catalog_records(monkeypatch):
+    _use(monkeypatch, [
+        CardRecord("hdfc-regalia-gold", "HDFC Regalia Gold Credit Card", annual_fee=2500),
+        CardRecord("axis-magnus", "Axis Bank Magnus Credit Card", annual_fee=12500),
+    ])
+    assert plan_comparison("best HDFC Regalia Gold alternatives") is None
+    assert plan_comparison("HDFC Regalia Gold vs Axis Magnus") == ["hdfc-regalia-gold", "axis-magnus"]
+    # SBI ELITE has a page but no record
+    assert plan_comparison("HDFC Regalia Gold vs SBI Card ELITE") is None
@@ -0,0 +1,33 @@
+import query_router
+from card_catalog import CardCatalog, CardRecord
+from card_resolver import CardResolver
+from query_router import COMPARISON, FACT, RECOMMENDATION, REVIEW, answer_fact, classify
+
+LISTING_TITLE = "Best Credit Cards in India 2025 - Compare & Apply"
+PAGES = [
+    ("https://www.bankbazaar.com/credit-card.html", "bankbazaar.com", LISTING_TITLE),
+    ("https://www.hdfcbank.com/regalia-gold", "hdfcbank.com", "HDFC Regalia Gold Credit Card"),
+]
+
+def _use(monkeypatch, records):
+    catalog = CardCatalog()
+    for record in records:
+        catalog.add(record)
+    resolver = CardResolver(PAGES + [(r.source_url, "hdfcbank.com", r.name) for r in records])
+    monkeypatch.setattr(query_router, "get_catalog", lambda: catalog)
+    monkeypatch.setattr(query_router, "get_resolver", lambda: resolver)
+
+def test_generic_questions_are_not_card_questions(monkeypatch):
+    _use(monkeypatch, [])
+    assert classify("Best card for airport lounge access?") == RECOMMENDATION
+    assert classify("What is the best card for travel") == RECOMMENDATION
+    assert classify("best HDFC Regalia Gold alternatives") == REVIEW
+    assert classify("HDFC Regalia Gold vs Axis Magnus") == COMPARISON
+
+def test_facts_come_only_from_single_card_records(monkeypatch):
+    listing = CardRecord("best", LISTING_TITLE, lounge_visits=8, source_url=PAGES[0][0])
+    regalia = CardRecord("hdfc-regalia-gold", "HDFC Regalia Gold Credit Card", lounge_visits=12, source_url=PAGES[1][0])
+    _use(monkeypatch, [listing, regalia])
+    assert answer_fact("Best card for airport lounge access?") is None
+    assert classify("HDFC Regalia Gold lounge visits?") == FACT
+    assert "12 complimentary" in answer_fact("HDFC Regalia Gold lounge visits?")
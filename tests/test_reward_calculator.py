@@ -0,0 +1,13 @@
+from card_catalog import REWARD_CATEGORIES
+from reward_calculator import spend_from_text
+
+def test_fee_amounts_are_not_spend():
+    assert spend_from_text("best cashback card for online shopping under 1000 fee") is None
+    spend = spend_from_text("Card with annual fee below ₹2,500 for travel I spend 15000 a month on")
+    assert spend[REWARD_CATEGORIES.index("travel")] == 15000
+
+def test_spend_per_category():
+    spend = spend_from_text("I spend ₹10,000 on dining, 5k on fuel and 20000 on other things")
+    assert spend[REWARD_CATEGORIES.index("dining")] == 10000
+    assert spend[REWARD_CATEGORIES.index("fuel")] == 5000
+    assert spend[REWARD_CATEGORIES.index("general")] == 20000
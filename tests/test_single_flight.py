@@ -0,0 +1,22 @@
+import threading
+from concurrent.futures import Future
+from single_flight import SingleFlight
+
+def test_run_with_already_finished_future():
+    done = Future()
+    done.set_result("answer")
+    flights = SingleFlight()
+    result = []
+    worker = threading.Thread(target=lambda: result.append(flights.run("k", lambda: done)), daemon=True)
+    worker.start()
+    worker.join(timeout=2)
+    assert result == [done]
+    assert flights.stats()["in_flight"] == 0
+
+def test_followers_share_the_leaders_future():
+    flights = SingleFlight()
+    future, leader = flights.begin("k")
+    follower, follower_leads = flights.begin("k")
+    assert leader and not follower_leads and follower is future
+    future.set_result("answer")
+    assert flights.stats()["in_flight"] == 0
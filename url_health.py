@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Failed URLs are skipped for NEGATIVE_BASE_TTL, doubling with every further
+# failure up to NEGATIVE_MAX_TTL
+NEGATIVE_BASE_TTL = 10 * 60  # Seconds
+NEGATIVE_MAX_TTL = 7 * 24 * 3600
+NEGATIVE_MAX_ENTRIES = 50000
+
+# A domain with BREAKER_THRESHOLD consecutive timeouts is skipped for
+# BREAKER_BASE_COOLDOWN, doubling each time it trips again
+BREAKER_THRESHOLD = 3
+BREAKER_BASE_COOLDOWN = 60  # Seconds
+BREAKER_MAX_COOLDOWN = 30 * 60
+
+# A fetch cancelled after running this long is treated as a timeout
+SLOW_FETCH_SECONDS = 4
+
+def _domain(url):
+    return urlparse(url).netloc.lower().replace('www.', '')
+
+class UrlHealth:
+    """Negative-result cache for failing URLs plus a per-domain circuit breaker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._negative = OrderedDict()  # url -> (failures, expires_at)
+        self._domains = {}  # domain -> {"timeouts", "trips", "open_until"}
+        self._stats = {"negative_hits": 0, "negative_misses": 0, "breaker_skips": 0, "breaker_trips": 0}
+
+    def allow(self, url):
+        """False if url is negatively cached or its domain's breaker is open"""
+        now = time.time()
+        with self._lock:
+            domain = self._domains.get(_domain(url))
+            if domain and domain["open_until"] > now:
+                self._stats["breaker_skips"] += 1
+                return False
+            entry = self._negative.get(url)
+            if entry and entry[1] > now:
+                self._stats["negative_hits"] += 1
+                return False
+            self._stats["negative_misses"] += 1
+            return True
+
+    def record_success(self, url):
+        with self._lock:
+            self._negative.pop(url, None)
+            self._domains.pop(_domain(url), None)
+
+    def record_failure(self, url, timeout=False):
+        """Back off a failed URL exponentially; timeouts also count towards the breaker"""
+        now = time.time()
+        with self._lock:
+            failures = self._negative.pop(url, (0, 0))[0] + 1
+            ttl = min(NEGATIVE_BASE_TTL * 2 ** (failures - 1), NEGATIVE_MAX_TTL)
+            self._negative[url] = (failures, now + ttl)
+            while len(self._negative) > NEGATIVE_MAX_ENTRIES:
+                self._negative.popitem(last=False)
+
+            if timeout:
+                domain = self._domains.setdefault(_domain(url), {"timeouts": 0, "trips": 0, "open_until": 0})
+                domain["timeouts"] += 1
+                if domain["timeouts"] >= BREAKER_THRESHOLD:
+                    cooldown = min(BREAKER_BASE_COOLDOWN * 2 ** domain["trips"], BREAKER_MAX_COOLDOWN)
+                    domain["open_until"] = now + cooldown
+                    domain["timeouts"] = 0
+                    domain["trips"] += 1
+                    self._stats["breaker_trips"] += 1
+
+    def stats(self):
+        """Hit/miss counters and currently open breakers"""
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["negative_entries"] = len(self._negative)
+            stats["open_breakers"] = sorted(
+                domain for domain, state in self._domains.items() if state["open_until"] > now
+            )
+        lookups = stats["negative_hits"] + stats["negative_misses"]
+        stats["negative_hit_rate"] = stats["negative_hits"] / lookups if lookups else 0.0
+        return stats
+
+# Shared by every session in the process
+url_health = UrlHealth()
@@ -0,0 +1,96 @@
+import atexit
+import random
+import threading
+import time
+from storage import data_path, load_json, save_json
+
+# Templates with at least this many attempts and a hit rate below the
+# threshold are skipped, except for occasional exploration fetches
+MIN_ATTEMPTS = 5
+SKIP_HIT_RATE = 0.05
+EXPLORE_RATE = 0.05
+SAVE_INTERVAL = 30  # Seconds between writes to disk
+
+class TemplateStats:
+    """Per-(domain, path template) fetch outcomes, persisted across restarts"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path("url_template_stats.json")
+        self._stats = load_json(self.path, {})
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        self._dirty = False
+
+    @staticmethod
+    def _key(domain, template):
+        return f"{domain}|{template}"
+
+    def record(self, domain, template, hit, latency):
+        """Record one fetch: hit means it yielded a usable snippet"""
+        with self._lock:
+            entry = self._stats.setdefault(self._key(domain, template), {"attempts": 0, "hits": 0, "latency": 0.0})
+            entry["attempts"] += 1
+            entry["hits"] += int(bool(hit))
+            entry["latency"] += latency
+            self._dirty = True
+        self.save()
+
+    def hit_rate(self, domain, template):
+        """Smoothed hit rate, optimistic for templates with no history"""
+        entry = self._stats.get(self._key(domain, template))
+        if not entry:
+            return 1.0
+        return (entry["hits"] + 1) / (entry["attempts"] + 2)
+
+    def mean_latency(self, domain, template):
+        entry = self._stats.get(self._key(domain, template))
+        if not entry or not entry["attempts"]:
+            return 0.0
+        return entry["latency"] / entry["attempts"]
+
+    def is_dead(self, domain, template):
+        entry = self._stats.get(self._key(domain, template))
+        if not entry or entry["attempts"] < MIN_ATTEMPTS:
+            return False
+        return entry["hits"] / entry["attempts"] < SKIP_HIT_RATE
+
+    def rank(self, candidates):
+        """Order (domain, template) pairs by hit rate then latency, dropping dead ones"""
+        selected = [
+            candidate for candidate in candidates
+            if not self.is_dead(*candidate) or random.random() < EXPLORE_RATE
+        ]
+        selected.sort(key=lambda c: (-self.hit_rate(*c), self.mean_latency(*c)))
+        return selected
+
+    def save(self, force=False):
+        """Persist the statistics, at most once per SAVE_INTERVAL unless forced"""
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._last_save < SAVE_INTERVAL):
+                return
+            snapshot = {key: dict(entry) for key, entry in self._stats.items()}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            save_json(self.path, snapshot)
+        except OSError:
+            pass
+
+    def summary(self):
+        """Counts for the diagnostics panel"""
+        with self._lock:
+            entries = list(self._stats.values())
+        dead = sum(
+            1 for entry in entries
+            if entry["attempts"] >= MIN_ATTEMPTS and entry["hits"] / entry["attempts"] < SKIP_HIT_RATE
+        )
+        return {
+            "templates": len(entries),
+            "skipped": dead,
+            "fetches": sum(entry["attempts"] for entry in entries),
+            "hits": sum(entry["hits"] for entry in entries),
+        }
+
+# Shared by every session in the process
+template_stats = TemplateStats()
+atexit.register(template_stats.save, force=True)
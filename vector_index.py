@@ -0,0 +1,153 @@
+"""Semantic passage index over the crawled corpus
+
+Passages are embedded with a small CPU sentence-transformers model and kept
+as an L2-normalised float32 matrix on disk, memory-mapped at query time and
+searched by brute-force dot product. Each build writes its matrix and row
+list under a new build id, then switches a small pointer file to it, so
+readers always load a matching pair. Rebuild it after a crawl with:
+
+    python vector_index.py
+"""
+import glob
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+from corpus_store import corpus_store
+from storage import data_path, load_json, save_json
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+ENCODE_BATCH_SIZE = 64
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class VectorIndex:
+    """Brute-force cosine search over a memory-mapped embedding matrix"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or "vectors"
+        self.current_path = data_path(self.directory, "current.json")
+        self._lock = threading.Lock()
+        self._model = None
+        self._matrix = None
+        self._rows = []
+        self._loaded_mtime = None
+
+    def _paths(self, build):
+        return (data_path(self.directory, f"embeddings-{build}.npy"),
+                data_path(self.directory, f"rows-{build}.json"))
+
+    @staticmethod
+    def available():
+        return SentenceTransformer is not None
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+            return self._model
+
+    def encode(self, texts):
+        """Normalised float32 embeddings, encoded in batches"""
+        return self._get_model().encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32)
+
+    def build(self):
+        """Embed every corpus passage, re-encoding only text not seen in the last build"""
+        passages = corpus_store.all_passages()
+        self._load()
+        previous = {}
+        if self._matrix is not None:
+            previous = {row["hash"]: i for i, row in enumerate(self._rows)}
+
+        rows = [{"id": passage_id, "hash": _text_hash(text)} for passage_id, text in passages]
+        new = [i for i, row in enumerate(rows) if row["hash"] not in previous]
+        dim = self._get_model().get_sentence_embedding_dimension()
+        matrix = np.zeros((len(rows), dim), dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row["hash"] in previous:
+                matrix[i] = self._matrix[previous[row["hash"]]]
+        if new:
+            matrix[new] = self.encode([passages[i][1] for i in new])
+
+        # Both files are complete before the pointer switches to them, in one atomic replace
+        build = str(time.time_ns())
+        matrix_path, rows_path = self._paths(build)
+        np.save(matrix_path, matrix)
+        save_json(rows_path, rows)
+        save_json(self.current_path, {"build": build})
+        with self._lock:
+            self._loaded_mtime = None
+        # Readers that mapped an older build keep their open file
+        for path in glob.glob(data_path(self.directory, "embeddings-*.npy")) + \
+                glob.glob(data_path(self.directory, "rows-*.json")):
+            if path not in (matrix_path, rows_path):
+                os.remove(path)
+        return len(rows), len(new)
+
+    def _load(self):
+        """(Re)map the matrix if the file changed since it was last loaded"""
+        try:
+            mtime = os.stat(self.current_path).st_mtime
+        except OSError:
+            return
+        with self._lock:
+            if mtime != self._loaded_mtime:
+                build = load_json(self.current_path, {}).get("build")
+                if build is None:
+                    return
+                matrix_path, rows_path = self._paths(build)
+                try:
+                    matrix = np.load(matrix_path, mmap_mode="r")
+                except OSError:
+                    return  # Superseded by a newer build while loading; retried next search
+                self._matrix = matrix
+                self._rows = load_json(rows_path, [])
+                self._loaded_mtime = mtime
+
+    def search(self, query, k=3, passages_per_page=2):
+        """Pages with the passages most similar to the query, best first"""
+        if not self.available():
+            return []
+        self._load()
+        matrix, rows = self._matrix, self._rows
+        if matrix is None or not len(rows) or len(rows) != len(matrix):
+            return []
+
+        scores = matrix @ self.encode([query])[0]
+        candidates = min(len(scores), k * passages_per_page * 5)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+
+        passages = corpus_store.get_passages([rows[i]["id"] for i in top])
+        pages = {}
+        for i in top:
+            passage = passages.get(rows[i]["id"])
+            if passage is None:
+                continue  # Re-crawled since the index was built
+            url, domain, title, text = passage
+            page = pages.setdefault(url, {"url": url, "domain": domain, "title": title,
+                                          "passages": [], "rank": -float(scores[i])})
+            if len(page["passages"]) < passages_per_page:
+                page["passages"].append(text)
+        return list(pages.values())[:k]
+
+# Shared by every session in the process
+vector_index = VectorIndex()
+
+if __name__ == '__main__':
+    if not VectorIndex.available():
+        raise SystemExit("sentence-transformers is not installed")
+    total, encoded = vector_index.build()
+    print(f"Indexed {total} passages ({encoded} newly encoded)")
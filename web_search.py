@@ -0,0 +1,325 @@
+from urllib.parse import urlparse
+import asyncio
+import time
+import aiohttp
+from http_client import get_session
+from url_templates import template_stats
+from http_cache import http_cache
+from url_health import url_health, SLOW_FETCH_SECONDS
+from page_parser import CREDIT_CARD_INDICATORS, score_text
+from corpus_store import corpus_store, banks_in, query_terms
+from card_resolver import get_resolver
+from vector_index import vector_index
+from parse_pool import extract_snippet_async
+
+# Define official bank and trusted domains
+PRIMARY_SOURCES = [
+    "cardinsider.com",  # Primary source
+    "bankbazaar.com",   # Secondary source
+]
+
+BANK_DOMAINS = [
+    "hdfcbank.com",
+    "sbicard.com",
+    "icicibank.com",
+    "axisbank.com",
+    "idfcfirstbank.com",
+    "indusind.com",
+    "hsbc.co.in",
+    "sc.com",
+    "kotak.com",
+    "yesbank.in",
+    "rblbank.com",
+    "creditcardinsider.in",
+    "cardexpert.in",
+]
+
+def is_trusted_domain(url):
+    """Check if the URL belongs to a trusted domain"""
+    try:
+        domain = urlparse(url).netloc.lower()
+        # Remove 'www.' if present
+        domain = domain.replace('www.', '')
+        return domain in PRIMARY_SOURCES or domain in BANK_DOMAINS
+    except:
+        return False
+
+# Per-tier deadlines in seconds; whatever has arrived by then is used
+PRIMARY_TIER_DEADLINE = 5
+VERIFICATION_TIER_DEADLINE = 5
+
+async def collect_first_results(coros, num_results, deadline, source_type):
+    """Return as soon as num_results snippets arrive, cancelling the remaining fetches"""
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    results = []
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            try:
+                result = await next_done
+            except asyncio.TimeoutError:
+                break  # Tier deadline reached
+            except Exception:
+                continue
+            if isinstance(result, dict) and result.get('snippet'):
+                results.append({**result, 'source_type': source_type})
+                if len(results) >= num_results:
+                    break
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        # Let cancelled fetches release their pooled connections
+        await asyncio.gather(*pending, return_exceptions=True)
+    return results
+
+# Reciprocal rank fusion constant for merging BM25 and semantic results
+RRF_K = 60
+
+def fuse_rankings(*rankings):
+    """Merge ranked page lists by reciprocal rank fusion, keeping each page's first entry"""
+    scores = {}
+    pages = {}
+    for ranking in rankings:
+        for position, page in enumerate(ranking):
+            scores[page['url']] = scores.get(page['url'], 0) + 1 / (RRF_K + position + 1)
+            pages.setdefault(page['url'], page)
+    return [pages[url] for url in sorted(scores, key=scores.get, reverse=True)]
+
+async def search_local_corpus(query, num_results):
+    """Snippets from the best BM25 and semantically matching passages of crawled pages"""
+    # A query naming banks only needs those banks' pages plus the aggregators
+    banks = banks_in(query)
+    pages = corpus_store.search(
+        query,
+        limit=num_results,
+        domains=PRIMARY_SOURCES if banks else None,
+        banks=banks
+    )
+    if vector_index.available():
+        # Catches paraphrases that share no keywords with the pages; the
+        # query embedding is CPU work, so keep it off the event loop
+        semantic_pages = await asyncio.to_thread(vector_index.search, query, num_results)
+        pages = fuse_rankings(pages, semantic_pages)[:num_results]
+    return [
+        {
+            'title': page['title'],
+            'link': page['url'],
+            'snippet': " | ".join(page['passages'])[:250],
+            'relevance_score': sum(score_text(passage, CREDIT_CARD_INDICATORS) for passage in page['passages']),
+            'source_type': 'primary' if page['domain'] in PRIMARY_SOURCES else 'verification'
+        }
+        for page in pages
+    ]
+
+# Function to perform web search using aiohttp
+async def perform_web_search(query, num_results=3, primary_deadline=PRIMARY_TIER_DEADLINE,
+                             verification_deadline=VERIFICATION_TIER_DEADLINE):
+    try:
+        # Crawled pages answer most queries without any network requests
+        formatted_results = await search_local_corpus(query, num_results)
+        if len(formatted_results) >= num_results:
+            return formatted_results
+        
+        # Primary source paths (more specific to detailed)
+        primary_paths = [
+            "/credit-card/compare/",
+            "/credit-cards/details/",
+            "/credit-card-reviews/",
+            "/credit-cards/search",
+            "/credit-cards"
+        ]
+        
+        # Verification source paths
+        verification_paths = [
+            "/credit-cards/benefits",
+            "/credit-card/offers",
+            "/credit-card/rewards",
+            "/cards/compare"
+        ]
+        
+        # Shared pooled session (timeout and headers are set on the session)
+        session = await get_session()
+        
+        # Cards named in the query are fetched from their known pages, one
+        # page per card, aggregator pages first
+        resolver = get_resolver()
+        card_ids = resolver.resolve(query)
+        known_pages = {card_id: resolver.best_page(card_id, PRIMARY_SOURCES + BANK_DOMAINS) for card_id in card_ids}
+        for source_type, domains, deadline in (('primary', PRIMARY_SOURCES, primary_deadline),
+                                               ('verification', BANK_DOMAINS, verification_deadline)):
+            seen = {result['link'] for result in formatted_results}
+            urls = [page[1] for page in known_pages.values() if page and page[0] in domains and page[1] not in seen]
+            if urls and len(formatted_results) < num_results:
+                formatted_results += await collect_first_results(
+                    [fetch_known(session, url, CREDIT_CARD_INDICATORS) for url in urls],
+                    num_results - len(formatted_results),
+                    deadline,
+                    source_type
+                )
+        if len(formatted_results) >= num_results:
+            return formatted_results
+        
+        # Cards without a known page are guessed by their canonical id; a
+        # query naming no known card falls back to its meaningful words
+        slugs = [card_id for card_id, page in known_pages.items() if not page]
+        if not card_ids:
+            slugs = ["-".join(query_terms(query))]
+        slugs = [slug for slug in slugs if slug]
+        
+        # Candidate (domain, path template) pairs, ranked by past hit rate
+        # so templates that never yield a snippet stop being fetched
+        primary_templates = template_stats.rank([
+            (domain, f"{path}{{slug}}")
+            for domain in PRIMARY_SOURCES
+            for path in primary_paths
+        ])
+        verification_templates = template_stats.rank([
+            (domain, path)
+            for domain in BANK_DOMAINS[:5]  # Limit to top 5 banks for speed
+            for path in verification_paths
+        ])
+        
+        # Then search primary sources live
+        formatted_results += await collect_first_results(
+            [fetch_template(session, domain, template, slug, CREDIT_CARD_INDICATORS)
+             for slug in slugs
+             for domain, template in primary_templates],
+            num_results - len(formatted_results),
+            primary_deadline,
+            'primary'
+        )
+        
+        # If needed, try verification sources
+        if len(formatted_results) < num_results:
+            formatted_results += await collect_first_results(
+                [fetch_template(session, domain, template, "", CREDIT_CARD_INDICATORS)
+                 for domain, template in verification_templates],
+                num_results - len(formatted_results),
+                verification_deadline,
+                'verification'
+            )
+        
+        return formatted_results
+                
+    except Exception:
+        return []
+
+async def fetch_template(session, domain, template, slug, credit_card_indicators):
+    """Fetch one templated URL and record whether the template produced a snippet"""
+    url = f"https://{domain}{template.format(slug=slug)}"
+    # Skip URLs that recently failed and domains that keep timing out
+    if not url_health.allow(url):
+        return None
+    start = time.monotonic()
+    result = await fetch_url(session, url, credit_card_indicators)
+    template_stats.record(domain, template, bool(result and result.get('snippet')), time.monotonic() - start)
+    return result
+
+async def fetch_known(session, url, credit_card_indicators):
+    """Fetch a page known to describe a card, unless it has been failing"""
+    if not url_health.allow(url):
+        return None
+    return await fetch_url(session, url, credit_card_indicators)
+
+async def fetch_url(session, url, credit_card_indicators):
+    start = time.monotonic()
+    try:
+        # Fresh cache entries skip the network and the HTML parse entirely;
+        # SQLite and zlib work runs in a thread so the loop only does I/O
+        cached = await asyncio.to_thread(http_cache.get, url)
+        if cached and cached["fresh"]:
+            http_cache.record('fresh_hits')
+            return cached["snippet"]
+        
+        headers = http_cache.validators(cached) if cached else {}
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached:
+                await asyncio.to_thread(http_cache.refresh, url)
+                http_cache.record('revalidated')
+                url_health.record_success(url)
+                return cached["snippet"]
+            http_cache.record('misses')
+            if response.status != 200:
+                url_health.record_failure(url)
+                return None
+            html = await response.text()
+            url_health.record_success(url)
+            result = await extract_snippet_async(html, str(response.url), credit_card_indicators)
+            await asyncio.to_thread(
+                http_cache.store, url, html, result,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            return result
+    except asyncio.CancelledError:
+        # Cancelled by a tier deadline after running this long counts as a timeout
+        if time.monotonic() - start >= SLOW_FETCH_SECONDS:
+            url_health.record_failure(url, timeout=True)
+        raise
+    except asyncio.TimeoutError:
+        url_health.record_failure(url, timeout=True)
+    except aiohttp.ClientError:
+        url_health.record_failure(url)
+    except Exception:
+        pass
+    return None
+
+# Function to enhance credit card response with web search
+async def enhance_with_web_search(query):
+    try:
+        search_query = f"{query} credit card features rewards"
+        search_results = await perform_web_search(search_query)
+        
+        if search_results:
+            # Sort results by relevance score
+            search_results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+            
+            # Remove duplicates based on snippet content
+            seen_snippets = set()
+            unique_results = []
+            for result in search_results:
+                snippet = result.get('snippet', '').strip()
+                # Create a simplified version of the snippet for comparison
+                simple_snippet = ' '.join(snippet.lower().split())
+                if simple_snippet and simple_snippet not in seen_snippets:
+                    seen_snippets.add(simple_snippet)
+                    unique_results.append(result)
+            
+            meaningful_results = [
+                result for result in unique_results
+                if result.get('snippet') and len(result['snippet'].strip()) > 50
+                and not any(term in result['snippet'].lower() for term in ['cookie', 'privacy', 'terms of use'])
+                and not result['snippet'].startswith('FIRST EA')  # Filter out repetitive IDFC updates
+            ]
+            
+            if meaningful_results:
+                enhancement = "\n\nLatest Credit Card Updates\n\n"
+                
+                # Group results by source type
+                primary_results = [r for r in meaningful_results if r['source_type'] == 'primary'][:2]  # Increased to 2 primary results
+                verification_results = [r for r in meaningful_results if r['source_type'] == 'verification'][:2]  # Increased to 2 verification results
+                
+                # Add primary source information
+                for result in primary_results:
+                    domain = urlparse(result['link']).netloc.replace('www.', '')
+                    snippet = result['snippet'].strip()
+                    if not any(existing in snippet.lower() for existing in seen_snippets):
+                        enhancement += f"• From {domain}: {snippet}\n\n"
+                        seen_snippets.add(snippet.lower())
+                
+                # Add verification information
+                for result in verification_results:
+                    domain = urlparse(result['link']).netloc.replace('www.', '')
+                    snippet = result['snippet'].strip()
+                    if not any(existing in snippet.lower() for existing in seen_snippets):
+                        enhancement += f"• From {domain}: {snippet}\n\n"
+                        seen_snippets.add(snippet.lower())
+                
+                # Add disclaimer
+                enhancement += "\n*Please verify the latest terms and conditions on the official bank website.*"
+                
+                return enhancement
+        return ""
+                
+    except Exception:
+        return ""